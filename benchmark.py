@@ -0,0 +1,286 @@
+"""
+Benchmarks of every pipeline stage on deterministic synthetic scripts (same seed, same input, see utils/synth.py):
+
+    python benchmark.py --platform steam --scripts 50 --commands 2000 --output bench.json
+
+Every stage is run --repeat times and the fastest run is reported with its throughput
+(commands/s, MB/s); peak memory (tracemalloc) is taken from one more run, since tracing slows
+the code down. Results are saved as JSON so runs before and after a change can be compared.
+
+Named baselines are kept in one JSON file; a run compared with a baseline fails (exit code 1) when
+a stage lost more throughput or grew its peak memory more than the thresholds allow:
+
+    python benchmark.py --save-baseline main
+    python benchmark.py --compare main --threshold 0.1 --memory-threshold 0.2
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform as host
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from utils.pak_archive import PAKArchive
+from utils.synth import ScriptGenerator
+
+
+class Benchmark:
+    def __init__(
+            self,
+            platform: str,
+            scripts: int = 20,
+            commands: int = 2000,
+            seed: int = 0,
+            repeat: int = 3,
+            memory: bool = True
+    ):
+        self.platform = platform
+        self.scripts = scripts
+        self.commands = commands
+        self.seed = seed
+        self.repeat = repeat
+        self.memory = memory
+        self.resolve = str.upper if platform == 'steam' else str.lower
+        self.disassembler_cls = importlib.import_module(f'{platform}.core.disassembler').ScriptDisassembler
+        self.assembler_cls = importlib.import_module(f'{platform}.core.assembler').ScriptAssembler
+        self.seen8500 = importlib.import_module(f'{platform}.core.seen8500')
+        self.seen8501 = importlib.import_module(f'{platform}.core.seen8501')
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def prepare(self, workdir: str) -> Dict[str, bytes]:
+        """Generate the synthetic PAK in workdir, return its files."""
+        generator = ScriptGenerator(self.platform, self.seed)
+        self.records = {}
+        files = {}
+        for script_name in generator.script_names(self.scripts):
+            self.records[script_name], files[script_name] = generator.script(script_name, self.commands)
+        files.update(generator.special_files())
+        self.pak_file = os.path.join(workdir, 'SCRIPT.PAK')
+        PAKArchive.create(self.pak_file, files)
+        return files
+
+    def measure(
+            self,
+            stage: str,
+            run: Callable[[Any], Any],
+            setup: Callable[[], Any] = lambda: None,
+            commands: int = 0,
+            size: int = 0
+    ) -> None:
+        timings = []
+        for _ in range(self.repeat):
+            with contextlib.redirect_stdout(io.StringIO()):  # per-script progress prints
+                state = setup()
+                wall, cpu = time.perf_counter(), time.process_time()
+                run(state)
+                timings.append((time.perf_counter() - wall, time.process_time() - cpu))
+        wall, cpu = min(timings)
+
+        peak = None
+        if self.memory:
+            with contextlib.redirect_stdout(io.StringIO()):
+                state = setup()
+                tracemalloc.start()
+                run(state)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        self.results[stage] = {
+            'seconds': wall,
+            'cpu_seconds': cpu,
+            'peak_memory_mb': peak / 2 ** 20 if peak is not None else None,
+            'commands_per_s': commands / wall if commands and wall else None,
+            'mb_per_s': size / 2 ** 20 / wall if size and wall else None
+        }
+        result = self.results[stage]
+        print(
+            f'{stage:<14} {wall * 1000:10.1f} ms'
+            + (f' {result["commands_per_s"]:12,.0f} cmd/s' if result['commands_per_s'] else ' ' * 19)
+            + (f' {result["mb_per_s"]:9.1f} MB/s' if result['mb_per_s'] else ' ' * 15)
+            + (f' {result["peak_memory_mb"]:9.1f} MB peak' if peak is not None else '')
+        )
+
+    def run(self) -> Dict[str, Any]:
+        with tempfile.TemporaryDirectory() as workdir:
+            files = self.prepare(workdir)
+            unpacked = os.path.join(workdir, 'unpacked')
+            assembled = os.path.join(workdir, 'assembled')
+            disassembled = os.path.join(workdir, 'disassembled')
+            os.makedirs(disassembled)
+            script_size = sum(len(data) for name, data in files.items() if name in self.records)
+            total_size = sum(len(data) for data in files.values())
+            commands = sum(len(records) for records in self.records.values())
+            pak = PAKArchive(original_pak=self.pak_file)
+
+            self.measure('read_header', lambda _: PAKArchive(original_pak=self.pak_file), size=pak.header['full_header_size'])
+            self.measure('extract', lambda _: pak.extract(output_dir=unpacked), size=total_size)
+            self.measure(
+                'parse_scripts', lambda disassembler: disassembler.parse_scripts(),
+                setup=lambda: self.disassembler_cls(script_folder=unpacked, parse=False, names=list(self.records)),
+                commands=commands, size=script_size
+            )
+            self.measure(
+                'disassemble', lambda disassembler: disassembler.disassemble(),
+                setup=lambda: self.disassembler_cls(script_folder=unpacked, names=list(self.records)),
+                commands=commands, size=script_size
+            )
+            self.measure(
+                'assemble', lambda assembler: assembler.assemble(),
+                setup=lambda: self.assembler_cls(disasm=self.records),
+                commands=commands, size=script_size
+            )
+            assembler = self.assembler_cls(disasm=self.records)
+            with contextlib.redirect_stdout(io.StringIO()):
+                assembler.assemble()
+            self.measure('save_asm', lambda _: assembler.save_asm(result_folder=assembled), size=script_size)
+            for name, module in ((self.resolve('SEEN8500'), self.seen8500), (self.resolve('SEEN8501'), self.seen8501)):
+                source, disasm = os.path.join(unpacked, name), os.path.join(disassembled, f'{name}.json')
+                self.measure(
+                    name.lower(),
+                    lambda _: (module.disassemble(source, disasm), module.assemble(disasm, os.path.join(assembled, name))),
+                    size=len(files[name])
+                )
+            output = os.path.join(workdir, 'SCRIPT_repacked.PAK')
+            self.measure('modify_pak', lambda _: pak.modify_pak(output_path=output, input_dir=unpacked), size=total_size)
+
+        return {
+            'platform': self.platform,
+            'config': {'scripts': self.scripts, 'commands': self.commands, 'seed': self.seed, 'repeat': self.repeat},
+            'host': {'python': sys.version.split()[0], 'machine': host.machine(), 'system': host.system()},
+            'commands': commands,
+            'script_bytes': script_size,
+            'stages': self.results
+        }
+
+
+class BaselineStore:
+    """Named benchmark results (e.g. one per branch or release) in one JSON file."""
+    def __init__(self, path: str):
+        self.path = path
+        self.baselines: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='UTF-8') as f:
+                self.baselines = json.load(f)
+
+    def get(self, name: str) -> Dict[str, Any]:
+        if name not in self.baselines:
+            known = ', '.join(sorted(self.baselines)) or 'none'
+            raise KeyError(f'no baseline {name!r} in {self.path} (known: {known})')
+        return self.baselines[name]
+
+    def put(self, name: str, results: Dict[str, Any]) -> None:
+        self.baselines[name] = results
+        with open(self.path, 'w', encoding='UTF-8') as f:
+            json.dump(self.baselines, f, indent=4)
+
+
+def throughput(result: Dict[str, Any]) -> float:
+    """Commands/s, MB/s for stages without commands, runs/s for the rest."""
+    return result['commands_per_s'] or result['mb_per_s'] or 1 / result['seconds']
+
+
+def compare(
+        baseline: Dict[str, Any],
+        results: Dict[str, Any],
+        threshold: float = 0.1,
+        memory_threshold: float = 0.1,
+        min_seconds: float = 0.001
+) -> Tuple[List[str], List[str]]:
+    """
+    Compare results with a baseline stage by stage, return the report lines and the regressions:
+    throughput dropped by more than threshold or peak memory grew by more than memory_threshold
+    (fractions). Stages shorter than min_seconds in both runs are reported but not judged, they are
+    mostly noise.
+    """
+    lines = [f'{"stage":<14} {"baseline":>14} {"current":>14} {"change":>8} {"memory":>8}']
+    regressions = []
+    for stage, result in results['stages'].items():
+        base = baseline['stages'].get(stage)
+        if base is None:
+            continue
+        change = throughput(result) / throughput(base) - 1
+        memory = None
+        if result['peak_memory_mb'] is not None and base['peak_memory_mb']:
+            memory = result['peak_memory_mb'] / base['peak_memory_mb'] - 1
+
+        verdict = ''
+        if max(result['seconds'], base['seconds']) < min_seconds:
+            verdict = 'too short'
+        else:
+            if change < -threshold:
+                regressions.append(f'{stage}: throughput {change:+.1%} (threshold -{threshold:.0%})')
+                verdict = 'SLOWER'
+            if memory is not None and memory > memory_threshold:
+                regressions.append(f'{stage}: peak memory {memory:+.1%} (threshold +{memory_threshold:.0%})')
+                verdict = (verdict + ' MEMORY').strip()
+        lines.append(
+            f'{stage:<14} {throughput(base):>14,.1f} {throughput(result):>14,.1f} {change:>+8.1%} '
+            + (f'{memory:>+8.1%}' if memory is not None else ' ' * 8)
+            + (f' {verdict}' if verdict else '')
+        )
+    return lines, regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark every pipeline stage on synthetic scripts')
+    parser.add_argument('--platform', choices=('steam', 'switch'), default='steam')
+    parser.add_argument('--scripts', type=int, default=20, help='number of scripts')
+    parser.add_argument('--commands', type=int, default=2000, help='commands per script')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the fastest one is reported')
+    parser.add_argument('--no-memory', action='store_true', help='skip the extra run measuring peak memory')
+    parser.add_argument('--output', help='save results to this JSON file')
+    parser.add_argument('--baselines', default='benchmark_baselines.json', help='file of the named baselines')
+    parser.add_argument('--save-baseline', metavar='NAME', help='store the results as baseline NAME')
+    parser.add_argument('--compare', metavar='NAME', help='compare with baseline NAME, exit with 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed throughput drop (0.1 = 10%%)')
+    parser.add_argument('--memory-threshold', type=float, default=0.1, help='allowed peak memory growth (0.1 = 10%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.001, help='do not judge stages faster than this')
+    args = parser.parse_args(argv)
+
+    store = BaselineStore(args.baselines)
+    baseline = None
+    if args.compare:
+        try:
+            baseline = store.get(args.compare)
+        except KeyError as e:
+            print(e.args[0])
+            return 2
+        config = {'scripts': args.scripts, 'commands': args.commands, 'seed': args.seed}
+        base_config = {key: baseline['config'][key] for key in config}
+        if baseline['platform'] != args.platform or base_config != config:
+            print(f'baseline {args.compare} was measured on other input: {baseline["platform"]} {base_config}')
+            return 2
+
+    benchmark = Benchmark(args.platform, args.scripts, args.commands, args.seed, args.repeat, not args.no_memory)
+    results = benchmark.run()
+    if args.output:
+        with open(args.output, 'w', encoding='UTF-8') as f:
+            json.dump(results, f, indent=4)
+        print(f'results saved in {args.output}')
+    if args.save_baseline:
+        store.put(args.save_baseline, results)
+        print(f'baseline {args.save_baseline} saved in {args.baselines}')
+
+    if baseline is None:
+        return 0
+    lines, regressions = compare(baseline, results, args.threshold, args.memory_threshold, args.min_seconds)
+    print(f'===Compared with baseline {args.compare}===')
+    print('\n'.join(lines))
+    if regressions:
+        print(f'{len(regressions)} regressions:')
+        for regression in regressions:
+            print(f'    {regression}')
+        return 1
+    print('No regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,430 @@
+"""
+One entry point for both platforms. Stages given together run in one process and share
+the archive, the parsed scripts and the opcode tables instead of going through the disk:
+
+    python cli.py --platform steam unpack
+    python cli.py --platform switch build --output switch/SCRIPT/SCRIPT_repacked.PAK
+    python cli.py verify
+    python cli.py diff --against other/SCRIPT_steam.PAK
+    python cli.py unpack build verify
+    python cli.py watch
+    python cli.py --profile --cprofile build.prof unpack build
+
+unpack   disassemble the PAK into the disassembly folder (plus xref, lookup and snapshot files)
+build    assemble the disassembly folder and build a new PAK, unchanged entries are copied from the original
+verify   check that the original scripts survive disassembling and assembling byte for byte,
+         differing scripts are reported with their first differing command and field
+diff     compare records of the original PAK with the disassembly folder or another PAK
+watch    build the PAK and update it on every saved file of the disassembly folder, until Ctrl+C
+
+--profile prints wall time, CPU time and peak memory of every phase and the slowest opcode handlers
+after the stages (see utils/profiling.py), --cprofile also saves cProfile statistics of the run.
+--events writes per-script progress and throughput as JSON lines (see utils/events.py), --quiet drops
+the per-script console lines.
+--overlap reads the next entries and writes the finished files in threads while unpack and build decode
+and encode (see utils/pipeline.py), which hides most of the I/O latency of slow or network storage.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from utils import compact, events, pipeline, profiling, verify
+from utils.pak_archive import PAKArchive
+from utils.verify import Mismatch
+from utils.watch import FolderWatcher
+
+STAGES = ('unpack', 'build', 'verify', 'diff', 'watch')
+
+
+class Project:
+    def __init__(self, platform: str, pak_file: str, workdir: str, cache: bool = True, overlap: bool = False):
+        self.platform = platform
+        self.pak_file = pak_file
+        self.workdir = Path(workdir)
+        self.disassembly_folder = self.workdir / 'disassembled'
+        self.cache_folder = self.workdir / 'cache' if cache else None
+        # steam names its files in upper case, switch in lower case
+        self.resolve = str.upper if platform == 'steam' else str.lower
+
+        self.disassembler_module = importlib.import_module(f'{platform}.core.disassembler')
+        self.assembler_module = importlib.import_module(f'{platform}.core.assembler')
+        self.special = {  # non-script files with their own format
+            self.resolve('SEEN8500'): importlib.import_module(f'{platform}.core.seen8500'),
+            self.resolve('SEEN8501'): importlib.import_module(f'{platform}.core.seen8501')
+        }
+        self.unpacked = False  # disassembly folder holds exactly the records in memory
+        self.overlap = overlap  # overlap reading and writing files with the work on them
+
+    @cached_property
+    def pak(self) -> PAKArchive:
+        return PAKArchive(original_pak=self.pak_file)
+
+    @cached_property
+    def disassembler(self):
+        disassembler = self.disassembler_module.ScriptDisassembler(
+            pak=self.pak,
+            cache_folder=str(self.cache_folder) if self.cache_folder else None
+        )
+        disassembler.disassemble()
+        return disassembler
+
+    @cached_property
+    def special_data(self) -> Dict[str, bytes]:
+        return self.pak.read_files([name for name in self.special if name in self.pak.file_list])
+
+    @cached_property
+    def special_records(self) -> Dict[str, list]:
+        return {name: self.special[name].parse(data) for name, data in self.special_data.items()}
+
+    def unpack(self) -> int:
+        print(f'===Disassembling {self.pak_file}===')
+        if self.overlap and 'disassembler' not in self.__dict__:
+            self.disassembler = self.disassemble_overlapped(self.disassembly_folder)
+        else:
+            self.disassembler.save_disasm(result_folder=str(self.disassembly_folder))
+        disassembler = self.disassembler
+        for name, records in self.special_records.items():
+            with open(self.disassembly_folder / f'{name}.json', 'w', encoding='UTF-8') as f:
+                json.dump(records, f, indent='\t', ensure_ascii=False)
+        disassembler.build_xref().save(str(self.workdir / 'xref.json'))
+        disassembler.lookup.save(str(self.workdir / 'lookup.json'))
+        disassembler.save_snapshot(str(self.workdir / 'project.snap'))
+        print(disassembler.strings.summary())
+        self.unpacked = True
+        return 0
+
+    @profiling.timed('disassemble')
+    def disassemble_overlapped(self, result_folder: Path):
+        """
+        Disassemble the PAK into result_folder as JSON, script by script: the next entries are read
+        and the finished scripts are written in threads while the current one is decoded. The threads
+        only do file I/O, decoding and JSON encoding stay in this thread (they would only contend for the GIL).
+        """
+        disassembler = self.disassembler_module.ScriptDisassembler(
+            cache_folder=str(self.cache_folder) if self.cache_folder else None,
+            parse=False  # scripts are added and parsed one by one
+        )
+        result_folder.mkdir(parents=True, exist_ok=True)
+        names = sorted(name for name in self.pak.file_list if disassembler.is_script(name))
+        progress = events.Progress('disassemble', len(names))
+
+        def decode(name: str, asm: bytes) -> bytes:
+            progress.begin()
+            script = disassembler.add_script(name, asm)
+            if not script.cached:
+                disassembler.parse_script(script)
+            disassembler.disassemble_script(script)
+            progress.script(name, len(script.disasm), len(asm), cached=script.cached)
+            return json.dumps(script.disasm, indent='\t', ensure_ascii=False).encode('UTF-8')
+
+        def save(name: str, data: bytes) -> None:
+            with open(result_folder / f'{name}.json', 'wb') as f:
+                f.write(data)
+
+        pipeline.run(names, self.pak.read_file, decode, save)
+        progress.finish()
+        if disassembler.cache_path:
+            disassembler.save_cache()
+        return disassembler
+
+    def assemble(self, records=None) -> Dict[str, bytes]:
+        """Assemble records (the disassembly folder by default), return file name -> data."""
+        if records is not None:
+            assembler = self.assembler_module.ScriptAssembler(disasm=records)
+            special = self.special_records
+        elif self.unpacked:  # the folder was just written from memory
+            assembler = self.assembler_module.ScriptAssembler(disasm=self.disassembler.scripts)
+            special = self.special_records
+        else:
+            if not self.disassembly_folder.is_dir():
+                raise FileNotFoundError(f'{self.disassembly_folder} not found, run unpack first')
+            assembler = self.assembler_module.ScriptAssembler(disasm_folder=str(self.disassembly_folder))
+            special = self.load_special_records()
+        assembler.assemble()
+        files = {script_name: bytes(script.asm) for script_name, script in assembler.scripts.items()}
+        files.update({name: self.special[name].build(data) for name, data in special.items()})
+        return files
+
+    def load_special_records(self) -> Dict[str, list]:
+        special = {}
+        for name in self.special:
+            path = self.disassembly_folder / f'{name}.json'
+            if path.exists():
+                with open(path, 'r', encoding='UTF-8') as f:
+                    special[name] = json.load(f)
+        return special
+
+    def build(self, output: str) -> int:
+        print(f'===Building {output}===')
+        if self.overlap and not self.unpacked:
+            self.build_overlapped(output)
+        else:
+            files = self.assemble()
+            self.pak.build_pak(output_path=output, files=files)
+        print(f'new file saved in {output}')
+        return 0
+
+    def build_overlapped(self, output: str) -> None:
+        """
+        Build the PAK from the disassembly folder: the files of the next scripts are read in threads
+        while the current one is decoded and laid out; then every entry is written out in a thread as soon
+        as it is assembled, unchanged entries are read from the original in threads as well.
+        """
+        if not self.disassembly_folder.is_dir():
+            raise FileNotFoundError(f'{self.disassembly_folder} not found, run unpack first')
+        # only the file names, records are read by the pipeline
+        assembler = self.assembler_module.ScriptAssembler(disasm_folder=str(self.disassembly_folder), lazy=True)
+        special = {name: self.special[name].build(records) for name, records in self.load_special_records().items()}
+        unknown = (set(assembler.scripts) | set(special)) - set(self.pak.file_list)
+        if unknown:
+            raise ValueError(f'Files not in the archive: {", ".join(sorted(unknown))}')
+
+        def read_records(script) -> bytes | Tuple[bytes, bytes]:
+            with open(script.path, 'rb') as f:
+                data = f.read()
+            if script.path.endswith(compact.EXTENSION):
+                with open(Path(script.path).with_suffix(compact.BLOB_EXTENSION), 'rb') as f:
+                    return data, f.read()
+            return data
+
+        def lay_out(script, data: bytes | Tuple[bytes, bytes]) -> None:
+            records = compact.decode(*data) if isinstance(data, tuple) else json.loads(data)
+            script.disasm = assembler.strings.intern_records(records)
+            script.path = ''  # the second pass takes the records from memory
+            commands, size = assembler.layout_script(script)
+            progress.script(script.name, commands, size)
+
+        def read_entry(name: str) -> bytes | None:
+            return None if name in assembler.scripts or name in special else self.pak.read_file(name)
+
+        def encode(name: str, data: bytes | None) -> bytes:
+            if name in assembler.scripts:
+                script = assembler.scripts[name]
+                commands = assembler.emit_script(script)
+                progress.script(name, commands, len(script.asm))
+                return bytes(script.asm)
+            return special.get(name, data)
+
+        # all scripts are laid out before the first one is emitted (FARCALL/JUMP need the labels of the others)
+        with profiling.phase('layout'):
+            progress = events.Progress('layout', len(assembler.scripts))
+            pipeline.run(list(assembler.scripts.values()), read_records, lay_out)
+            progress.finish()
+        with profiling.phase('emit'), self.pak.writer(output) as writer:
+            progress = events.Progress('emit', len(assembler.scripts))
+            pipeline.run(self.pak.file_list, read_entry, encode, writer.write)
+            progress.finish()
+
+    def watch(self, output: str) -> int:
+        if not self.disassembly_folder.is_dir():
+            raise FileNotFoundError(f'{self.disassembly_folder} not found, run unpack first')
+        print(f'===Building {output}===')
+        assembler = self.assembler_module.ScriptAssembler(disasm_folder=str(self.disassembly_folder))
+        assembler.assemble()
+        files = {script_name: bytes(script.asm) for script_name, script in assembler.scripts.items()}
+        files.update({name: self.special[name].build(data) for name, data in self.load_special_records().items()})
+        self.pak.build_pak(output_path=output, files=files)
+        output_pak = PAKArchive(original_pak=output)
+
+        watcher = FolderWatcher(str(self.disassembly_folder))
+        print(f'===Watching {self.disassembly_folder} ({watcher.mode}), Ctrl+C to stop===')
+        failed = False  # a change failed halfway, assembled scripts may be stale: the next one assembles everything
+        try:
+            for changed in watcher.changes():
+                start = time.perf_counter()
+                try:
+                    updated = self.apply_changes(assembler, changed, reassemble=failed)
+                    if failed:  # edits of special files in the failed change may be lost as well
+                        special = self.load_special_records()
+                        updated.update({name: self.special[name].build(data) for name, data in special.items()})
+                        failed = False
+                except Exception as e:  # e.g. a half-written or broken file, keep watching
+                    print(f'{", ".join(sorted(changed))}: {e!r}, the next change assembles all scripts again')
+                    failed = True
+                    continue
+                if not updated:
+                    continue
+                files.update(updated)
+                # entries that still fit are overwritten in place, otherwise the archive is written again
+                how = 'patched'
+                if not output_pak.patch(updated):
+                    self.pak.build_pak(output_path=output, files=files)
+                    output_pak = PAKArchive(original_pak=output)
+                    how = 'rebuilt'
+                print(f'{", ".join(sorted(updated))}: {output} {how} in {(time.perf_counter() - start) * 1000:.0f} ms')
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+        return 0
+
+    def apply_changes(self, assembler, changed: Iterable[str], reassemble: bool = False) -> Dict[str, bytes]:
+        """Assemble the changed files of the disassembly folder again, see apply_records."""
+        records = {}
+        for file in changed:
+            name = file[:-len('.json')]
+            if name not in self.special and name not in assembler.scripts:
+                continue
+            with open(self.disassembly_folder / file, 'r', encoding='UTF-8') as f:
+                records[name] = json.load(f)
+        return self.apply_records(assembler, records, reassemble)
+
+    def apply_records(self, assembler, records: Mapping[str, list], reassemble: bool = False) -> Dict[str, bytes]:
+        """
+        Assemble edited scripts (file name -> all its records) again, return file name -> data of every
+        updated file. Edited records are laid out in place (jumps into them from other scripts are
+        patched), added or removed records need the whole corpus to be assembled again; so does
+        reassemble=True, e.g. after a failed call left some scripts half updated.
+        """
+        updated = {}
+        scripts = set()
+        for name, script_records in records.items():
+            if name in self.special:
+                updated[name] = self.special[name].build(script_records)
+                continue
+            script = assembler.scripts[name]
+            if reassemble or len(script_records) != len(script.disasm):
+                script.disasm = script_records
+                reassemble = True
+                continue
+            edited = {
+                index: record for index, (record, old) in enumerate(zip(script_records, script.disasm)) if record != old
+            }
+            if edited:
+                assembler.relayout(name, edited)
+                scripts.add(name)
+
+        if reassemble:
+            assembler.assemble()
+            scripts.update(assembler.scripts)
+        scripts |= assembler.patched
+        assembler.patched.clear()
+        updated.update({script_name: bytes(assembler.scripts[script_name].asm) for script_name in scripts})
+        return updated
+
+    def verify(self) -> int:
+        print('===Verifying round trip===')
+        files, different, mismatches = self.round_trip()
+        for mismatch in mismatches:
+            print(mismatch)
+        for name in different:
+            if name in self.special:
+                print(f'{name} differs from the original')
+        if different:
+            print(f'Attention: {len(different)} out of {files} files are different.')
+            return 1
+        print(f'All {files} files match their originals.')
+        return 0
+
+    def round_trip(self) -> Tuple[int, List[str], List[Mismatch]]:
+        """Disassemble and assemble the original files, return their count, the differing ones and where scripts differ."""
+        originals = {script_name: bytes(script.asm) for script_name, script in self.disassembler.scripts.items()}
+        originals.update(self.special_data)
+        rebuilt = self.assemble(records=self.disassembler.scripts)
+        different = [name for name in originals if rebuilt.get(name) != originals[name]]
+        # scripts are compared command by command to show where they differ
+        mismatches = verify.verify_scripts(
+            self.disassembler_module.ScriptDisassembler,
+            {name: (originals[name], rebuilt.get(name, b'')) for name in different if name not in self.special}
+        )
+        return len(originals), different, mismatches
+
+    def diff(self, against: str | None = None) -> int:
+        base = {script_name: script.disasm for script_name, script in self.disassembler.scripts.items()}
+        if against and os.path.isfile(against):
+            other_project = Project(self.platform, against, self.workdir, cache=self.cache_folder is not None)
+            other = {script_name: script.disasm for script_name, script in other_project.disassembler.scripts.items()}
+        else:
+            assembler = self.assembler_module.ScriptAssembler(disasm_folder=against or str(self.disassembly_folder))
+            other = {script_name: script.disasm for script_name, script in assembler.scripts.items()}
+        print(f'===Comparing {self.pak_file} with {against or self.disassembly_folder}===')
+
+        changed = 0
+        for script_name in sorted(set(base) | set(other)):
+            if script_name not in other or script_name not in base:
+                print(f'{script_name}: only in {self.pak_file if script_name in base else against or self.disassembly_folder}')
+                changed += 1
+                continue
+            differences = self.record_differences(base[script_name], other[script_name])
+            if differences:
+                changed += 1
+                print(f'{script_name}: {len(differences)} records differ')
+                for line in differences[:5]:
+                    print(f'    {line}')
+        print(f'{changed} scripts differ' if changed else 'No differences')
+        return 1 if changed else 0
+
+    @staticmethod
+    def record_differences(base: List[dict], other: List[dict]) -> List[str]:
+        differences = []
+        for index, (record, other_record) in enumerate(zip(base, other)):
+            if record != other_record:
+                fields = [field for field in record.keys() | other_record.keys() if record.get(field) != other_record.get(field)]
+                differences.append(f'#{index} label {record["label"]} {record["opcode"]}: {", ".join(sorted(fields))}')
+        if len(base) != len(other):
+            differences.append(f'{len(base)} records vs {len(other)}')
+        return differences
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Luca System script tools')
+    parser.add_argument('stages', nargs='+', choices=STAGES, help='stages to run, in the given order')
+    parser.add_argument('--platform', choices=('steam', 'switch'), default='steam')
+    parser.add_argument('--pak', help='original SCRIPT.PAK (default: <platform>/SCRIPT/SCRIPT_<platform>.PAK)')
+    parser.add_argument('--workdir', help='folder for disassembly, cache and indexes (default: <platform>/SCRIPT)')
+    parser.add_argument('--output', help='PAK built by build and watch (default: <workdir>/SCRIPT_repacked.PAK)')
+    parser.add_argument('--against', help='PAK or disassembly folder to compare with in diff (default: the disassembly folder)')
+    parser.add_argument('--no-cache', action='store_true', help='do not use the disassembly cache')
+    parser.add_argument('--profile', action='store_true', help='print time and memory of every phase and opcode handler')
+    parser.add_argument('--cprofile', metavar='FILE', help='save cProfile statistics to FILE (implies --profile)')
+    parser.add_argument('--events', metavar='FILE', help='append progress and metrics events to FILE as JSON lines (- is stdout)')
+    parser.add_argument('--quiet', action='store_true', help='do not print a line per script')
+    parser.add_argument('--overlap', action='store_true', help='overlap file I/O with unpack and build (for slow or network storage)')
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or os.path.join(args.platform, 'SCRIPT')
+    project = Project(
+        platform=args.platform,
+        pak_file=args.pak or os.path.join(args.platform, 'SCRIPT', f'SCRIPT_{args.platform}.PAK'),
+        workdir=workdir,
+        cache=not args.no_cache,
+        overlap=args.overlap
+    )
+    if args.quiet:
+        events.unsubscribe(events.print_event)
+    sink = events.subscribe(events.JsonLinesSink(args.events)) if args.events else None
+    profiler = None
+    if args.profile or args.cprofile:
+        profiler = profiling.Profiler(
+            instrument=(project.disassembler_module.ScriptDisassembler, project.assembler_module.ScriptAssembler),
+            cprofile=args.cprofile
+        ).start()
+    status = 0
+    try:
+        for stage in args.stages:
+            if stage in ('build', 'watch'):
+                status |= getattr(project, stage)(args.output or os.path.join(workdir, 'SCRIPT_repacked.PAK'))
+            elif stage == 'diff':
+                status |= project.diff(args.against)
+            else:
+                status |= getattr(project, stage)()
+    finally:
+        if sink is not None:
+            events.unsubscribe(sink)
+            sink.close()
+        if profiler is not None:
+            profiler.stop()
+            print(profiler.report())
+            if args.cprofile:
+                print(f'cProfile statistics saved in {args.cprofile}')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Local server keeping one project warm in memory for editor plugins and batch scripts: the PAK is read
+and disassembled once, edits are assembled incrementally (see Project.apply_records).
+
+    python server.py --platform steam --port 8765
+
+JSON over HTTP, only on 127.0.0.1:
+
+GET  /scripts                               script names with their command counts
+GET  /scripts/<name>                        records of a script (SEEN8500/SEEN8501 too)
+PUT  /scripts/<name>                        replace the records of a script (body: list of records)
+PUT  /scripts/<name>/<index>                replace one record (body: record)
+GET  /scripts/<name>/asm                    assembled script (binary)
+GET  /search?text=...&opcode=...&limit=100  text fields containing text (case-insensitive)
+POST /rebuild                               lay out all scripts again from their records
+POST /build                                 build the PAK given by --output
+POST /verify                                round trip of the original files
+
+Requests must be addressed to the server itself (Host 127.0.0.1:<port> or localhost:<port>, same for
+Origin if sent), PUT and POST ones must be sent as application/json, even without a body: a web page
+cannot send such a request without a CORS preflight, which the server doesn't answer.
+
+Requests are handled one at a time, so there is no locking. Errors are {"error": message} with
+status 400 (bad request, e.g. records that cannot be assembled), 403 (foreign Host or Origin),
+404 (unknown script or path), 415 (not JSON) or 500.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from cli import Project
+from utils.pak_archive import PAKArchive
+
+
+class RequestError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ProjectServer:
+    def __init__(self, project: Project, output: str):
+        self.project = project
+        self.output = output
+        start = time.perf_counter()
+        disassembler = project.disassembler
+        self.assembler = project.assembler_module.ScriptAssembler(disasm=disassembler.scripts)
+        self.assembler.assemble()
+        self.special_records = dict(project.special_records)
+        # current data of every file, and the files changed since the last build of output
+        self.files = {name: bytes(script.asm) for name, script in self.assembler.scripts.items()}
+        self.files.update(project.special_data)
+        self.changed: Dict[str, bytes] = {}
+        self.output_pak: PAKArchive | None = None
+        print(f'{len(self.files)} files loaded in {time.perf_counter() - start:.1f} s')
+
+    def records(self, name: str) -> list:
+        if name in self.special_records:
+            return self.special_records[name]
+        if name not in self.assembler.scripts:
+            raise RequestError(HTTPStatus.NOT_FOUND, f'no script {name}')
+        return self.assembler.scripts[name].disasm
+
+    def scripts(self) -> Dict[str, int]:
+        return {name: len(script.disasm) for name, script in self.assembler.scripts.items()}
+
+    def put_records(self, name: str, records: Any) -> Dict[str, Any]:
+        old = self.records(name)
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise RequestError(HTTPStatus.BAD_REQUEST, 'records must be a list of objects')
+        try:
+            updated = self.project.apply_records(self.assembler, {name: records})
+        except Exception as e:  # e.g. a missing field or an unknown opcode
+            # a failed relayout changes nothing; when records were added or removed, the whole corpus
+            # was being assembled with the new list in place of the old one: assemble the old one again
+            script = self.assembler.scripts.get(name)
+            if script is not None and script.disasm is not old:
+                script.disasm = old
+                self.assembler.assemble()
+            raise RequestError(HTTPStatus.BAD_REQUEST, f'cannot assemble {name}: {e!r}')
+        if name in self.special_records:
+            self.special_records[name] = records
+        self.files.update(updated)
+        self.changed.update(updated)
+        return {'updated': sorted(updated)}
+
+    def put_record(self, name: str, index: int, record: Any) -> Dict[str, Any]:
+        records = list(self.records(name))  # the old list stays as it was
+        if not 0 <= index < len(records):
+            raise RequestError(HTTPStatus.NOT_FOUND, f'{name} has no record {index}')
+        records[index] = record
+        return self.put_records(name, records)
+
+    def asm(self, name: str) -> bytes:
+        if name not in self.files:
+            raise RequestError(HTTPStatus.NOT_FOUND, f'no file {name}')
+        return self.files[name]
+
+    def search(self, text: str, opcode: str | None = None, limit: int = 100) -> List[Dict[str, Any]]:
+        text = text.lower()
+        found = []
+        for name, script in self.assembler.scripts.items():
+            for index, record in enumerate(script.disasm):
+                if opcode and record['opcode'] != opcode:
+                    continue
+                for field, value in record.items():
+                    if (field.startswith('msg_') or field == 'varstr_str') and value and text in value.lower():
+                        found.append({
+                            'script': name, 'index': index, 'label': record['label'],
+                            'opcode': record['opcode'], 'field': field, 'text': value
+                        })
+                        if len(found) >= limit:
+                            return found
+        return found
+
+    def rebuild(self) -> Dict[str, Any]:
+        self.assembler.assemble()
+        updated = {name: bytes(script.asm) for name, script in self.assembler.scripts.items()}
+        self.files.update(updated)
+        self.changed.update(updated)
+        return {'updated': len(updated)}
+
+    def build(self) -> Dict[str, Any]:
+        """Build the output PAK, entries changed since the last build are patched in place if they fit."""
+        start = time.perf_counter()
+        how = 'patched'
+        if self.output_pak is None or not self.output_pak.patch(self.changed):
+            self.project.pak.build_pak(output_path=self.output, files=self.files)
+            self.output_pak = PAKArchive(original_pak=self.output)
+            how = 'built'
+        self.changed.clear()
+        return {'output': self.output, 'how': how, 'seconds': time.perf_counter() - start}
+
+    def verify(self) -> Dict[str, Any]:
+        files, different, mismatches = self.project.round_trip()
+        return {'files': files, 'different': different, 'mismatches': [str(mismatch) for mismatch in mismatches]}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = 'LucaProjectServer/1'
+    project: ProjectServer  # set by serve()
+
+    def do_GET(self) -> None:
+        self.handle_request('GET')
+
+    def do_PUT(self) -> None:
+        self.handle_request('PUT')
+
+    def do_POST(self) -> None:
+        self.handle_request('POST')
+
+    def handle_request(self, method: str) -> None:
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+        try:
+            self.check_request(method)
+            status, body = self.route(method, parts, parse_qs(url.query))
+        except RequestError as e:
+            status, body = e.status, {'error': str(e)}
+        except Exception as e:
+            status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': repr(e)}
+        if isinstance(body, bytes):
+            self.send(status, body, 'application/octet-stream')
+        else:
+            self.send(status, json.dumps(body, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def check_request(self, method: str) -> None:
+        """Refuse requests a web page could send (see the module docstring)."""
+        port = self.server.server_address[1]
+        hosts = {f'127.0.0.1:{port}', f'localhost:{port}'}
+        if self.headers.get('Host') not in hosts:
+            raise RequestError(HTTPStatus.FORBIDDEN, f'Host must be one of {", ".join(sorted(hosts))}')
+        origin = self.headers.get('Origin')
+        if origin is not None and origin not in {f'http://{host}' for host in hosts}:
+            raise RequestError(HTTPStatus.FORBIDDEN, f'foreign Origin {origin}')
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if method in ('PUT', 'POST') and content_type != 'application/json':
+            raise RequestError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, 'requests must be sent as application/json')
+
+    def route(self, method: str, parts: List[str], query: Dict[str, List[str]]) -> Tuple[HTTPStatus, Any]:
+        project = self.project
+        match method, parts:
+            case 'GET', ['scripts']:
+                return HTTPStatus.OK, project.scripts()
+            case 'GET', ['scripts', name]:
+                return HTTPStatus.OK, project.records(name)
+            case 'GET', ['scripts', name, 'asm']:
+                return HTTPStatus.OK, project.asm(name)
+            case 'PUT', ['scripts', name]:
+                return HTTPStatus.OK, project.put_records(name, self.read_json())
+            case 'PUT', ['scripts', name, index] if index.isdigit():
+                return HTTPStatus.OK, project.put_record(name, int(index), self.read_json())
+            case 'GET', ['search']:
+                if not query.get('text'):
+                    raise RequestError(HTTPStatus.BAD_REQUEST, 'text is required')
+                limit = query.get('limit', ['100'])[0]
+                if not limit.isdigit():
+                    raise RequestError(HTTPStatus.BAD_REQUEST, 'limit must be a number')
+                return HTTPStatus.OK, project.search(query['text'][0], query.get('opcode', [None])[0], int(limit))
+            case 'POST', ['rebuild']:
+                return HTTPStatus.OK, project.rebuild()
+            case 'POST', ['build']:
+                return HTTPStatus.OK, project.build()
+            case 'POST', ['verify']:
+                return HTTPStatus.OK, project.verify()
+        raise RequestError(HTTPStatus.NOT_FOUND, f'no such request: {method} /{"/".join(parts)}')
+
+    def read_json(self) -> Any:
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f'invalid JSON: {e}')
+
+    def send(self, status: HTTPStatus, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(project: ProjectServer, port: int) -> None:
+    RequestHandler.project = project
+    with HTTPServer(('127.0.0.1', port), RequestHandler) as httpd:
+        print(f'===Serving {project.project.pak_file} on http://127.0.0.1:{httpd.server_port}, Ctrl+C to stop===')
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Serve one project from memory on localhost')
+    parser.add_argument('--platform', choices=('steam', 'switch'), default='steam')
+    parser.add_argument('--pak', help='original SCRIPT.PAK (default: <platform>/SCRIPT/SCRIPT_<platform>.PAK)')
+    parser.add_argument('--workdir', help='folder for the cache (default: <platform>/SCRIPT)')
+    parser.add_argument('--output', help='PAK built by /build (default: <workdir>/SCRIPT_repacked.PAK)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--no-cache', action='store_true', help='do not use the disassembly cache')
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or os.path.join(args.platform, 'SCRIPT')
+    project = Project(
+        platform=args.platform,
+        pak_file=args.pak or os.path.join(args.platform, 'SCRIPT', f'SCRIPT_{args.platform}.PAK'),
+        workdir=workdir,
+        cache=not args.no_cache
+    )
+    serve(ProjectServer(project, args.output or os.path.join(workdir, 'SCRIPT_repacked.PAK')), args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
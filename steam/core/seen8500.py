@@ -6,9 +6,7 @@ from utils.helpers import Charset
 first_accessory = 'カップゼリー'.encode('utf-16le')
 
 
-def disassemble(seen8500_path: str, disasm_path: str):
-    with open(seen8500_path, 'rb') as f:
-        data = f.read()
+def parse(data: bytes) -> list:
     result = []
     index = data.find(first_accessory)   # header length
     result.append({
@@ -35,14 +33,12 @@ def disassemble(seen8500_path: str, disasm_path: str):
     result.append({
         'end': data[start:].hex()
     })
-    with open(disasm_path, "w", encoding="UTF-8") as new_file:
-        json.dump(result, new_file, indent="\t", ensure_ascii=False)
+    return result
 
 
-def assemble(disasm_path: str, repack_path: str):
+def build(data: list) -> bytes:
     result = bytes()
-    with open(disasm_path, 'r') as f:
-        data = json.loads(f.read())
+    data = list(data)
     header = bytes.fromhex(data.pop(0)['header'])
     end = bytes.fromhex(data.pop(-1)['end'])
 
@@ -53,9 +49,21 @@ def assemble(disasm_path: str, repack_path: str):
         result += helpers.pack_param(value=accessory['var1'], type='uint8')
         result += helpers.pack_param(value=accessory['var2'], type='uint16')
     result += end
+    return result
 
+
+def disassemble(seen8500_path: str, disasm_path: str):
+    with open(seen8500_path, 'rb') as f:
+        data = f.read()
+    with open(disasm_path, "w", encoding="UTF-8") as new_file:
+        json.dump(parse(data), new_file, indent="\t", ensure_ascii=False)
+
+
+def assemble(disasm_path: str, repack_path: str):
+    with open(disasm_path, 'r') as f:
+        data = json.loads(f.read())
     with open(repack_path, "wb") as new_file:
-        new_file.write(result)
+        new_file.write(build(data))
 
 
 if __name__ == '__main__':
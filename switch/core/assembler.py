@@ -1,10 +1,13 @@
 import json
 import os
+from array import array
 import struct
 from pathlib import Path
-from typing import Dict
-from utils import helpers
-from utils.helpers import Charset
+from typing import Callable, Dict, Iterable, List, Mapping, Set, Tuple
+from utils import compact, events, helpers, profiling
+from utils.labels import LabelTable
+from utils.strpool import StringPool
+from utils.helpers import Charset, handler
 from collections import OrderedDict
 
 
@@ -14,63 +17,247 @@ class Script:
         self.disasm: dict = {}
         self.asm: bytearray = bytearray()
         self.label_index: Dict[int, int] = {}  # original_label -> new_index in disasm
+        self.path: str = ''  # json file, set in lazy mode instead of disasm
 
 
 class ScriptAssembler:
-    def __init__(self, disasm_folder: str):
+    """
+    Scripts are loaded either from the JSON files in disasm_folder or directly from disasm,
+    a mapping of script names to their records: ScriptDisassembler.scripts (Script objects)
+    or any iterable of record dicts. The second way skips the JSON round trip entirely;
+    a project snapshot is such a mapping too: ScriptAssembler(disasm=snapshot.Snapshot(path)).
+
+    With lazy=True only file names are indexed at construction: every pass reads a script's JSON
+    right before processing it and drops it afterwards, so only label_map (two uint32 per command,
+    see LabelTable) stays in memory between passes. Jump sites are not collected, so there is no relayout().
+    """
+    opcode_file = os.path.join(os.path.dirname(__file__), 'opcode_switch.txt')
+    opcodes: Dict[str, int] = {}  # opcode name -> byte
+    dispatch: List[Callable | None] = []  # opcode byte -> handler (marked with @handler)
+
+    def __init__(
+            self,
+            disasm_folder: str | None = None,
+            disasm: Mapping[str, Iterable[dict]] | None = None,
+            lazy: bool = False
+    ):
         self.scripts = OrderedDict()
         self.current_script: str = ''  # name
-        self.label_map: Dict[str, Dict[int, int]] = {}  # script_name -> {original_label: new_label}
-
-        # load decompiled scripts
-        for script_file in os.listdir(disasm_folder):
-            lwr = script_file.lower()
+        self.lazy = lazy
+        self.label_map: Dict[str, LabelTable] = {}  # script_name -> original and new labels of its commands
+        # target script -> {(source script, command index): original target label}, not collected in lazy mode
+        self.jump_sites: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self.patched: Set[str] = set()  # other scripts whose jumps relayout() patched, cleared by the caller
+        self.strings = StringPool()
+
+        # take records from memory
+        for script_name, records in (disasm or {}).items():
+            script = Script()
+            script.name = script_name
+            # disassembler's Script objects keep their records in .disasm
+            script.disasm = list(getattr(records, 'disasm', records))
+            self.scripts[script.name] = script
+
+        # load decompiled scripts (pretty JSON or compact format, JSON wins if both are present)
+        script_files = set(os.listdir(disasm_folder) if disasm_folder else [])
+        for script_file in script_files:
+            script_name, extension = os.path.splitext(script_file)
+            if extension not in ('.json', compact.EXTENSION):
+                continue
+            if extension == compact.EXTENSION and f'{script_name}.json' in script_files:
+                continue
+            lwr = script_name.lower()
             # fuck macOS .DS_Store
             if not (lwr.startswith('_') or lwr.startswith('seen') or lwr.startswith('ミニゲ')):
                 continue
             # idk what the rest of the _-files are for
-            if (lwr.startswith('_')) and (lwr not in ["_varstr.json", '_sayavoice.json', '_keyword.json']):
+            if (lwr.startswith('_')) and (lwr not in ["_varstr", '_sayavoice', '_keyword']):
                 continue
             # see explanation in repository description
             if 'seen8500' in lwr or 'seen8501' in lwr:
                 continue
 
-            script_path = os.path.join(disasm_folder, script_file)
-            with open(script_path, 'r') as f:
-                script = Script()
-                script.name = script_file.replace('.json', '')
-                script.disasm = json.loads(f.read())
-                self.scripts[script.name] = script
+            script = Script()
+            script.name = script_name
+            script.path = os.path.join(disasm_folder, script_file)
+            if not lazy:
+                script.disasm = self.strings.intern_records(self.load_disasm(script))
+                script.path = ''
+            self.scripts[script.name] = script
 
-        # load opcodes (line number in file = byte that encodes the opcode)
-        self.opcodes = {}
-        with open('./core/opcode_switch.txt') as file:
-            self.opcodes = {opcode: i for i, opcode in enumerate(file.read().splitlines())}
+        self.load_opcodes()
 
         self.scripts = OrderedDict((key, self.scripts[key]) for key in sorted(self.scripts))
 
+    @classmethod
+    def load_opcodes(cls) -> None:
+        if cls.__dict__.get('dispatch'):  # already resolved for this class
+            return
+        # load opcodes (line number in file = byte that encodes the opcode)
+        with open(cls.opcode_file) as file:
+            cls.opcodes = {opcode: i for i, opcode in enumerate(file.read().splitlines())}
+        cls.dispatch = helpers.build_dispatch(cls, list(cls.opcodes))
+
     def assemble(self):
+        """Lay out and encode all scripts; records are not modified, so this can be called repeatedly."""
+        self.label_map = {}
+        self.jump_sites = {}
+
         # first pass: calculating new offsets (labels) for goto/gosub/... instructions
-        for script_name, script in self.scripts.items():
-            self.current_script = script_name
-            print(f'calculate offsets for {script_name}')
-            label = 0
-            for cmd in script.disasm:
-                new_label = label
-                if script_name not in self.label_map:
-                    self.label_map[script_name] = {}
-                self.label_map[script_name][cmd['label']] = new_label
-                command = self.make_command(data=cmd, calc_mode=True)
-                label += len(command)
+        with profiling.phase('layout'):
+            progress = events.Progress('layout', len(self.scripts))
+            for script_name, script in self.scripts.items():
+                commands, size = self.layout_script(script)
+                progress.script(script_name, commands, size)
+            progress.finish()
 
         # second pass: actual assembly
+        with profiling.phase('emit'):
+            progress = events.Progress('emit', len(self.scripts))
+            for script_name, script in self.scripts.items():
+                commands = self.emit_script(script)
+                progress.script(script_name, commands, len(script.asm))
+            progress.finish()
+
+    def layout_script(self, script: Script) -> Tuple[int, int]:
+        """First pass over one script: new labels and jump sites. Returns the number of commands and the size."""
+        self.current_script = script.name
+        labels = self.label_map[script.name] = LabelTable()
+        label = commands = 0
+        for index, cmd in enumerate(self.load_disasm(script)):
+            labels.append(cmd['label'], label)
+            if not self.lazy:
+                self.add_jump_site(script.name, index, cmd)
+            command = self.make_command(data=cmd, calc_mode=True)
+            label += len(command)
+            commands += 1
+        return commands, label
+
+    def emit_script(self, script: Script) -> int:
+        """Second pass over one script, all scripts must be laid out. Returns the number of commands."""
+        self.current_script = script.name  # for goto/gosub/... handlers
+        script.asm = bytearray()
+        commands = 0
+        for cmd in self.load_disasm(script):
+            command = self.make_command(data=cmd, calc_mode=False)
+            script.asm += command
+            commands += 1
+        return commands
+
+    @profiling.timed('layout')
+    def relayout(self, script_name: str, edited: Dict[int, dict]) -> bytes:
+        """
+        Update an already assembled script after some of its records were edited.
+
+        edited maps command indexes to the new records. Only these commands are encoded again,
+        the rest of the old bytes is spliced around them. Labels after the first edit are shifted
+        and only the jumps whose targets moved are patched, FARCALL/JUMP in other scripts included.
+        Returns the new bytes of the script.
+
+        Everything is encoded before anything is changed: if a record cannot be encoded, the
+        exception leaves records, labels, jump sites and bytes as they were.
+        """
+        if self.lazy:
+            raise ValueError('relayout needs the records in memory and the jump sites, the assembler is lazy')
+        script = self.scripts[script_name]
+        old_labels = self.label_map[script_name]
+        offsets = old_labels.offsets
+        ends = offsets[1:] + array('I', [len(script.asm)])
+
+        self.current_script = script_name
+        sizes = {index: len(self.make_command(data=cmd, calc_mode=True)) for index, cmd in edited.items()}
+        # new jump sites of the edited commands: command index -> (target script, original target label)
+        sites = {
+            index: (self.jump_target(cmd), cmd['jump_pos']) for index, cmd in edited.items() if cmd.get('jump_pos') is not None
+        }
+
+        # shift labels after the first edited command
+        labels = old_labels.copy()
+        moved = set()
+        delta = 0
+        for index in range(min(edited), len(offsets)):
+            if delta:
+                labels.offsets[index] = offsets[index] + delta
+                moved.add(labels.labels[index])
+            if index in sizes:
+                delta += sizes[index] - (ends[index] - offsets[index])
+
+        # the edited commands and the patched jumps are encoded against the new labels
+        self.label_map[script_name] = labels
+        try:
+            # splice edited commands into the old bytes
+            asm = bytearray()
+            start = 0
+            for index in sorted(edited):
+                asm += script.asm[start:offsets[index]]
+                asm += self.make_command(data=edited[index], calc_mode=False)
+                start = ends[index]
+            asm += script.asm[start:]
+
+            # jumps into the moved part of the script: (source script, new offset, command)
+            patches: List[Tuple[str, int, bytes]] = []
+            for (source, index), target_label in self.jump_sites.get(script_name, {}).items():
+                if target_label in moved and not (source == script_name and index in edited):
+                    self.current_script = source
+                    command = self.make_command(data=self.scripts[source].disasm[index], calc_mode=False)
+                    patches.append((source, self.label_map[source].offsets[index], command))
+        except Exception:
+            self.label_map[script_name] = old_labels
+            raise
+
+        # commit
+        records = script.disasm
+        for index, cmd in edited.items():
+            records[index] = cmd
+            for target_sites in self.jump_sites.values():
+                target_sites.pop((script_name, index), None)
+            if index in sites:
+                target, target_label = sites[index]
+                self.jump_sites.setdefault(target, {})[(script_name, index)] = target_label
+        script.asm = asm
+        for source, offset, command in patches:
+            source_asm = asm if source == script_name else self.scripts[source].asm
+            source_asm[offset:offset + len(command)] = command
+            self.patched.add(source)
+
+        return bytes(script.asm)
+
+    def add_jump_site(self, script_name: str, index: int, cmd: dict) -> None:
+        if cmd.get('jump_pos') is not None:
+            self.current_script = script_name
+            self.jump_sites.setdefault(self.jump_target(cmd), {})[(script_name, index)] = cmd['jump_pos']
+
+    def jump_target(self, data: dict) -> str:
+        """Name of the script that jump_pos of the command points into."""
+        if 'filename' in data:
+            return data['filename'].lower()
+        return self.current_script
+
+    @staticmethod
+    def load_disasm(script: Script) -> list:
+        """Return script records, reading them from disk if the script is loaded lazily."""
+        if not script.path:
+            return script.disasm
+        if script.path.endswith(compact.EXTENSION):
+            return compact.load(script.path)
+        with open(script.path, 'r') as f:
+            return json.loads(f.read())
+
+    @profiling.timed('save')
+    def save_disasm(self, result_folder: str, fmt: str = 'compact') -> None:
+        """Write the loaded records back, by default in the compact format (e.g. edited JSON as a CI artifact)."""
+        output_path = Path(result_folder)
+        output_path.mkdir(parents=True, exist_ok=True)
+
         for script_name, script in self.scripts.items():
-            print(f'assembling {script_name}')
-            self.current_script = script.name  # for goto/gosub/... handlers
-            for cmd in script.disasm:
-                command = self.make_command(data=cmd, calc_mode=False)
-                script.asm += command
+            records = self.load_disasm(script)
+            if fmt == 'compact':
+                compact.dump(records, os.path.join(output_path, f"{script_name}{compact.EXTENSION}"))
+                continue
+            with open(os.path.join(output_path, f"{script_name}.json"), "w", encoding="UTF-8") as new_file:
+                json.dump(records, new_file, indent="\t", ensure_ascii=False)
 
+    @profiling.timed('save')
     def save_asm(self, result_folder: str) -> None:
         output_path = Path(result_folder)
         output_path.mkdir(parents=True, exist_ok=True)
@@ -81,47 +268,28 @@ class ScriptAssembler:
                 new_file.write(script.asm)
 
     def make_command(self, data, calc_mode=False):
-        handlers_table = {
-            'MESSAGE': self.message_handler,
-            'SELECT': self.select_handler,
-            'BATTLE': self.battle_handler,
-            'TASK': self.task_handler,
-            'CSAYAVOICETEXT': self.csayavoicetext_handler,
-            'VARSTR_SET': self.varstr_set_handler,
-            'GOTO': self.goto_handler,
-            'GOSUB': self.gosub_handler,
-            'JUMP': self.jump_handler,
-            'FARCALL': self.farcall_handler,
-            'IFN': self.ifn_ify_handler,
-            'IFY': self.ifn_ify_handler,
-            'RANDOM': self.random_handler,
-            #'ADD': self.add_handler,
-            'IMAGELOAD': self.imageload_handler
-        }
-
         fixed_param = b''
         if data['flag'] == 1:
             fixed_param = struct.pack('<H', *data['fixed_param'])
         elif data['flag'] >= 2:
             fixed_param = struct.pack('<HH', *data['fixed_param'])
 
-        command = struct.pack('<BB', self.opcodes[data['opcode']], data['flag'])
+        opcode = self.opcodes[data['opcode']]
+        command = struct.pack('<BB', opcode, data['flag'])
         command += fixed_param
 
         if 'raw_args' in data:
             command += bytes.fromhex(data['raw_args'])
 
-        elif data['opcode'] in handlers_table:
+        elif (code_handler := self.dispatch[opcode]) is not None:
 
             # not for first pass with calculation of new offsets
             if not calc_mode:
                 if data.get('jump_pos') is not None:
-                    filename = self.current_script
-                    if 'filename' in data:
-                        filename = data['filename'].lower()
-                    data['jump_pos'] = self.label_map[filename][data['jump_pos']]
+                    # relocated copy, the record itself keeps the original label
+                    data = dict(data, jump_pos=self.label_map[self.jump_target(data)][data['jump_pos']])
 
-            command = handlers_table[data['opcode']](data, command)
+            command = code_handler(self, data, command)
 
         else:
             raise Exception(f'need handler for opcode: {data["opcode"]}')
@@ -132,6 +300,7 @@ class ScriptAssembler:
 
         return full_command
 
+    @handler('MESSAGE')
     def message_handler(self, data: dict, command: bytes):
         en_coding = Charset.UTF_8 if not self.current_script.startswith('ミニゲ') else Charset.Unicode
         command += helpers.pack_param(value=data['voice_id'], type='uint16')
@@ -141,8 +310,8 @@ class ScriptAssembler:
             command += bytes.fromhex(data['end'])
         return command
 
-    @staticmethod
-    def select_handler(data: dict, command: bytes):
+    @handler('SELECT')
+    def select_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['var_id'], type='uint16')
         command += helpers.pack_param(value=data['var0'], type='uint16')
         command += helpers.pack_param(value=data['var1'], type='uint16')
@@ -153,8 +322,8 @@ class ScriptAssembler:
         command += helpers.pack_param(value=data['var4'], type='uint16')
         return command
 
-    @staticmethod
-    def battle_handler(data: dict, command: bytes) -> bytes:
+    @handler('BATTLE')
+    def battle_handler(self, data: dict, command: bytes) -> bytes:
         command += helpers.pack_param(value=data['battle_type'], type='uint16')
 
         match data['battle_type']:
@@ -209,8 +378,8 @@ class ScriptAssembler:
 
         return command
 
-    @staticmethod
-    def task_handler(data: dict, command: bytes) -> bytes:
+    @handler('TASK')
+    def task_handler(self, data: dict, command: bytes) -> bytes:
         command += helpers.pack_param(value=data['task_type'], type='uint16')
 
         match data['task_type']:
@@ -253,15 +422,15 @@ class ScriptAssembler:
 
         return command
 
-    @staticmethod
-    def csayavoicetext_handler(data: dict, command: bytes):
+    @handler('CSAYAVOICETEXT')
+    def csayavoicetext_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['voice_id'], type='uint16')
         command += helpers.pack_param(value=data['msg_jp'], type='string', coding=Charset.Unicode, switch=True)
         command += helpers.pack_param(value=data['msg_en'], type='string', coding=Charset.Unicode, switch=True)
         return command
 
-    @staticmethod
-    def varstr_set_handler(data: dict, command: bytes):
+    @handler('VARSTR_SET')
+    def varstr_set_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['varstr_id'], type='uint16')
         str_bytes = helpers.pack_param(value=data['varstr_str'], type='string', coding=Charset.Unicode, switch=True)
         if str_bytes == b'\x00':
@@ -269,8 +438,8 @@ class ScriptAssembler:
         command += str_bytes
         return command
 
-    @staticmethod
-    def farcall_handler(data: dict, command: bytes):
+    @handler('FARCALL')
+    def farcall_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['index'], type='uint16')
         command += helpers.pack_param(value=data['filename'], type='string', coding=Charset.ShiftJIS, switch=True)
         command += helpers.pack_param(value=data['jump_pos'], type='uint32')
@@ -278,47 +447,47 @@ class ScriptAssembler:
             command += bytes.fromhex(data['end'])
         return command
 
-    @staticmethod
-    def goto_handler(data: dict, command: bytes):
+    @handler('GOTO')
+    def goto_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['jump_pos'], type='uint32')
         return command
 
-    @staticmethod
-    def gosub_handler(data: dict, command: bytes):
+    @handler('GOSUB')
+    def gosub_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['arg1'], type='uint16')
         command += helpers.pack_param(value=data['jump_pos'], type='uint32')
         if data['end'] is not None:
             command += bytes.fromhex(data['end'])
         return command
 
-    @staticmethod
-    def jump_handler(data: dict, command: bytes):
+    @handler('JUMP')
+    def jump_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['filename'], type='string', coding=Charset.ShiftJIS, switch=True)
         if data['jump_pos'] is not None:
             command += helpers.pack_param(value=data['jump_pos'], type='uint32')
         return command
 
-    @staticmethod
-    def ifn_ify_handler(data: dict, command: bytes):
+    @handler('IFN', 'IFY')
+    def ifn_ify_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['condition'], type='string', coding=Charset.ShiftJIS, switch=True)
         command += helpers.pack_param(value=data['jump_pos'], type='uint32')
         return command
 
-    @staticmethod
-    def random_handler(data: dict, command: bytes):
+    @handler('RANDOM')
+    def random_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['var1'], type='uint16')
         command += helpers.pack_param(value=data['rnd_from'], type='string', coding=Charset.ShiftJIS, switch=True)
         command += helpers.pack_param(value=data['rnd_to'], type='string', coding=Charset.ShiftJIS, switch=True)
         return command
 
-    @staticmethod
-    def add_handler(data: dict, command: bytes):
+    # @handler('ADD')  # for some reason it breaks some scripts
+    def add_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['var1'], type='uint16')
         command += helpers.pack_param(value=data['expr'], type='string', coding=Charset.ShiftJIS, switch=True)
         return command
 
-    @staticmethod
-    def imageload_handler(data: dict, command: bytes):
+    @handler('IMAGELOAD')
+    def imageload_handler(self, data: dict, command: bytes):
         command += helpers.pack_param(value=data['mode'], type='uint16')
         command += helpers.pack_param(value=data['image_id'], type='uint16')
         if data['var1'] is not None:
@@ -1,11 +1,19 @@
+import hashlib
+import inspect
 import json
+import marshal
 import os
 import struct
 from collections import OrderedDict
 from pathlib import Path
-from typing import List
-from utils import helpers
-from utils.helpers import Charset
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from utils import cfg, compact, events, helpers, profiling, snapshot
+from utils.cfg import ControlFlowGraph
+from utils.helpers import Charset, handler
+from utils.lookup import LookupIndex
+from utils.strpool import StringPool
+from utils.pak_archive import PAKArchive
+from utils.xref import XrefIndex
 
 
 class Opcode:
@@ -29,6 +37,8 @@ class Script:
         self.disasm: List[dict] = []
         self.opcodes: List[Opcode] = []
         self.code_num: int = 0
+        self.hash: str = ''  # hash of name and asm, key in the disassembly cache
+        self.cached: bool = False  # disasm was taken from the cache, opcodes are not parsed
 
 
 class ScriptDisassembler:
@@ -53,127 +63,307 @@ class ScriptDisassembler:
 
     4. Alignment:
        - if command length is odd, an extra byte is added for 2-byte alignment
-    """
-    def __init__(self, script_folder):
-        self.scripts = OrderedDict()
 
-        # load scripts
-        for script_file in os.listdir(script_folder):
-            lwr = script_file.lower()
-            # fuck macOS .DS_Store
-            if not (lwr.startswith('_') or lwr.startswith('seen') or lwr.startswith('ミニゲ')):
-                continue
-            # idk what the rest of the _-files are for
-            if (lwr.startswith('_')) and (lwr not in ["_varstr", '_sayavoice', '_keyword']):
-                continue
-            # see explanation in repository description
-            if 'seen8500' in lwr or 'seen8501' in lwr:
-                continue
+    Opcode handlers are methods marked with @handler; the opcode table and the handler of every
+    opcode byte are resolved once per class, so a subclass can plug in more handlers.
 
-            script_path = os.path.join(script_folder, script_file)
-            with open(script_path, 'rb') as f:
-                script = Script()
-                script.name = script_file.replace('.json', '')
-                script.asm = f.read()
-                self.scripts[script.name] = script
+    With cache_folder set, records of every script are stored under the hash of its name and bytes and reused
+    on the next run instead of parsing and disassembling it again. The cache is keyed by cache_version(),
+    so it is invalidated by any change of the opcode table, the handler code or the graph builder.
 
-        # load opcodes (line number in file = byte that encodes the opcode)
-        self.opcodes = {}
-        with open('core/opcode_switch.txt') as file:
-            self.opcodes = {i: opcode for i, opcode in enumerate(file.read().splitlines())}
+    Scripts are read from script_folder or straight from pak; names (script names or glob patterns)
+    restricts the work to the matching scripts.
+
+    For text export parse=False skips building Opcode objects and extract_text() walks the raw
+    command stream, decoding only the text-bearing opcodes.
+    """
+    opcode_file = os.path.join(os.path.dirname(__file__), 'opcode_switch.txt')
+    opcodes: Dict[int, str] = {}  # opcode byte -> name
+    dispatch: List[Callable | None] = []  # opcode byte -> handler
+    text_opcodes = ('MESSAGE', 'SELECT', 'BATTLE', 'TASK', 'CSAYAVOICETEXT', 'VARSTR_SET')
+    # opcodes carrying voice_id/image_id, indexed while disassembling
+    lookup_opcodes = ('MESSAGE', 'CSAYAVOICETEXT', 'IMAGELOAD')
+    lookup_bytes: set = set()  # opcode bytes of lookup_opcodes
+
+    def __init__(
+            self,
+            script_folder: str | None = None,
+            cache_folder: str | None = None,
+            parse: bool = True,
+            names: Iterable[str] | None = None,
+            pak: PAKArchive | None = None
+    ):
+        self.scripts = OrderedDict()
+        self.cache_path: Path | None = None
+        self.lookup = LookupIndex()
+        self.strings = StringPool()  # repeating string values shared across the corpus
+
+        # load scripts, only the selected ones if names (script names or glob patterns) are given;
+        # without script_folder and pak there are no scripts, only single commands are decoded (see decode_command)
+        script_files = os.listdir(script_folder) if script_folder else pak.file_list if pak else []
+        script_files = [
+            script_file for script_file in script_files
+            if self.is_script(script_file) and (names is None or helpers.name_matches(script_file, names))
+        ]
+        # read straight from the archive, no need to extract it first
+        pak_files = pak.read_files(script_files) if pak else {}
+        for script_file in script_files:
+            if pak:
+                asm = pak_files[script_file]
+            else:
+                with open(os.path.join(script_folder, script_file), 'rb') as f:
+                    asm = f.read()
+            self.add_script(script_file.replace('.json', ''), asm)
+
+        self.load_opcodes()
 
         self.current_script = None
         self.scripts = OrderedDict((key, self.scripts[key]) for key in sorted(self.scripts))
-        self.parse_scripts()
+        if cache_folder:
+            self.load_cache(cache_folder)
+        if parse:
+            self.parse_scripts()
 
+    @staticmethod
+    def is_script(script_file: str) -> bool:
+        lwr = script_file.lower()
+        # fuck macOS .DS_Store
+        if not (lwr.startswith('_') or lwr.startswith('seen') or lwr.startswith('ミニゲ')):
+            return False
+        # idk what the rest of the _-files are for
+        if (lwr.startswith('_')) and (lwr not in ["_varstr", '_sayavoice', '_keyword']):
+            return False
+        # see explanation in repository description
+        if 'seen8500' in lwr or 'seen8501' in lwr:
+            return False
+        return True
+
+    @classmethod
+    def load_opcodes(cls) -> None:
+        if cls.__dict__.get('dispatch'):  # already resolved for this class
+            return
+        # load opcodes (line number in file = byte that encodes the opcode)
+        with open(cls.opcode_file) as file:
+            cls.opcodes = {i: opcode for i, opcode in enumerate(file.read().splitlines())}
+        cls.dispatch = helpers.build_dispatch(cls, list(cls.opcodes.values()))
+        cls.lookup_bytes = {i for i, opcode in cls.opcodes.items() if opcode in cls.lookup_opcodes}
+
+    @classmethod
+    def cache_version(cls) -> str:
+        """Hash of everything the cached records and graphs depend on besides the script itself."""
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(bytes([marshal.version]))  # cache files are only read back by the same marshal version
+        for path in (cls.opcode_file, inspect.getfile(cls), helpers.__file__, compact.__file__, cfg.__file__):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def add_script(self, script_name: str, asm: bytes) -> Script:
+        """Add a script read by the caller, taking its records from the cache if it is loaded and has them."""
+        script = Script()
+        script.name = script_name
+        script.asm = asm
+        if self.cache_path:
+            self.load_cached(script)
+        self.scripts[script_name] = script
+        return script
+
+    def load_cache(self, cache_folder: str) -> None:
+        self.cache_path = Path(cache_folder) / self.cache_version()
+        for script in self.scripts.values():
+            self.load_cached(script)
+
+    def load_cached(self, script: Script) -> None:
+        # the name is hashed too: decoding may depend on it (e.g. text coding of minigame scripts)
+        script.hash = hashlib.blake2b(script.name.encode() + b'\0' + script.asm, digest_size=16).hexdigest()
+        cache_file = self.cache_path / f'{script.hash}{compact.EXTENSION}'
+        if not cache_file.exists():
+            return
+        try:
+            records = compact.load(str(cache_file))
+        except (ValueError, EOFError, OSError):  # unreadable (e.g. truncated) cache file, disassemble again
+            return
+        script.disasm = self.strings.intern_records(records)
+        script.cached = True
+
+    def save_cache(self) -> None:
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        for script in self.scripts.values():
+            if not script.cached:
+                compact.dump(script.disasm, str(self.cache_path / f'{script.hash}{compact.EXTENSION}'))
+                script.cached = True
+
+    @profiling.timed('parse')
     def parse_scripts(self):
+        progress = events.Progress('parse', sum(not script.cached for script in self.scripts.values()))
         for script_name, script in self.scripts.items():
-            print(f'parse {script_name}')
-            offset = 0
-            while offset < len(script.asm):
-                code = Opcode()
-
-                # read length, opcode byte and flag (number of params depends on it)
-                code.len, code.opcode, code.flag = struct.unpack_from('<HBB', script.asm, offset)
-                code.opstr = self.opcodes[code.opcode]
-                offset += 4
-
-                # read the rest of the command
-                raw_bytes_len = code.len - 4
-                code.raw_bytes = script.asm[offset:offset + raw_bytes_len]
-                offset += raw_bytes_len
-
-                # read align (if any)
-                if code.len % 2 != 0:
-                    code.align = script.asm[offset:offset + 1]
-                    offset += 1
-
-                # parse opcode params
-                if code.flag > 0:
-                    if code.flag >= 2:
-                        code.fixed_param = list(struct.unpack_from('<HH', code.raw_bytes))
-                        code.param_bytes = code.raw_bytes[4:]
-                    else:
-                        code.fixed_param = [struct.unpack_from('<H', code.raw_bytes)[0]]
-                        code.param_bytes = code.raw_bytes[2:]
+            if script.cached:
+                continue
+            progress.begin()
+            self.parse_script(script)
+            progress.script(script_name, script.code_num, len(script.asm))
+        progress.finish()
+
+    def parse_script(self, script: Script) -> None:
+        offset = 0
+        while offset < len(script.asm):
+            code = Opcode()
+
+            # read length, opcode byte and flag (number of params depends on it)
+            code.len, code.opcode, code.flag = struct.unpack_from('<HBB', script.asm, offset)
+            code.opstr = self.opcodes[code.opcode]
+            offset += 4
+
+            # read the rest of the command
+            raw_bytes_len = code.len - 4
+            code.raw_bytes = script.asm[offset:offset + raw_bytes_len]
+            offset += raw_bytes_len
+
+            # read align (if any)
+            if code.len % 2 != 0:
+                code.align = script.asm[offset:offset + 1]
+                offset += 1
+
+            # parse opcode params
+            if code.flag > 0:
+                if code.flag >= 2:
+                    code.fixed_param = list(struct.unpack_from('<HH', code.raw_bytes))
+                    code.param_bytes = code.raw_bytes[4:]
                 else:
-                    code.param_bytes = code.raw_bytes
+                    code.fixed_param = [struct.unpack_from('<H', code.raw_bytes)[0]]
+                    code.param_bytes = code.raw_bytes[2:]
+            else:
+                code.param_bytes = code.raw_bytes
 
-                script.opcodes.append(code)
+            script.opcodes.append(code)
 
-            script.code_num = len(script.opcodes)
+        script.code_num = len(script.opcodes)
 
-            pos = 0
-            for i, code in enumerate(script.opcodes):
-                code.index = i
-                code.pos = pos
-                pos += (code.len + 1) & ~1  # align to 2 bytes
+        pos = 0
+        for i, code in enumerate(script.opcodes):
+            code.index = i
+            code.pos = pos
+            pos += (code.len + 1) & ~1  # align to 2 bytes
 
-    def save_disasm(self, result_folder: str) -> None:
+    @staticmethod
+    def iter_commands(asm: bytes) -> Iterator[Tuple[int, int, int, int]]:
+        """Yield position, length, opcode byte and flag of every command in the script."""
+        offset = 0
+        while offset < len(asm):
+            length, opcode, flag = struct.unpack_from('<HBB', asm, offset)
+            yield offset, length, opcode, flag
+            offset += (length + 1) & ~1  # align to 2 bytes
+
+    def decode_command(self, script_name: str, command: bytes) -> dict:
+        """Record of a single command of the script (its bytes up to the align byte), without label."""
+        self.current_script = script_name
+        length, opcode, flag = struct.unpack_from('<HBB', command)
+        fixed_len = 4 if flag >= 2 else 2 if flag == 1 else 0
+        result = {
+            'opcode': self.opcodes[opcode],
+            'flag': flag,
+            'fixed_param': list(struct.unpack_from(f'<{fixed_len // 2}H', command, 4))
+        }
+        param_bytes = command[4 + fixed_len:length]
+        code_handler = self.dispatch[opcode]
+        if code_handler is not None:
+            return code_handler(self, param_bytes, result)
+        result['raw_args'] = param_bytes.hex()
+        return result
+
+    def extract_text(self) -> Iterator[Tuple[str, int, str, str, str]]:
+        """Yield (script, label, opcode, field, text) for every non-empty text field in all scripts."""
+        text_opcodes = {i for i, opcode in self.opcodes.items() if opcode in self.text_opcodes}
+        for script_name, script in self.scripts.items():
+            self.current_script = script_name
+            for pos, length, opcode, flag in self.iter_commands(script.asm):
+                if opcode not in text_opcodes:
+                    continue
+                fixed_len = 4 if flag >= 2 else 2 if flag == 1 else 0
+                param_bytes = script.asm[pos + 4 + fixed_len:pos + length]
+                result = self.dispatch[opcode](self, param_bytes, {})
+                for field, text in result.items():
+                    if text and (field.startswith('msg_') or field == 'varstr_str'):
+                        yield script_name, pos, self.opcodes[opcode], field, text
+
+    def build_xref(self) -> XrefIndex:
+        """Cross-reference index of labels and jumps of the disassembled scripts."""
+        return XrefIndex.build(self.scripts, resolve=str.lower)
+
+    def build_cfgs(self) -> Dict[str, ControlFlowGraph]:
+        """
+        Control flow graph of every script; with the cache enabled graphs are stored next to
+        the cached records and reused while the script doesn't change.
+        """
+        cfgs = {}
+        for script_name, script in self.scripts.items():
+            cache_file = None
+            if self.cache_path:
+                cache_file = self.cache_path / f'{script.hash}.cfg.json'
+                if cache_file.exists():
+                    cfgs[script_name] = ControlFlowGraph.load(str(cache_file))
+                    continue
+            cfgs[script_name] = ControlFlowGraph.build(script.disasm, resolve=str.lower)
+            if cache_file:
+                self.cache_path.mkdir(parents=True, exist_ok=True)
+                cfgs[script_name].save(str(cache_file))
+        return cfgs
+
+    @profiling.timed('save')
+    def save_snapshot(self, path: str) -> None:
+        """Save records of all scripts with the indexes into one snapshot file."""
+        snapshot.dump(path, self.scripts, xref=self.build_xref(), lookup=self.lookup)
+
+    @profiling.timed('save')
+    def save_disasm(self, result_folder: str, fmt: str = 'json') -> None:
+        """Save records as pretty JSON for editing or, with fmt='compact', in the compact binary format."""
         output_path = Path(result_folder)
         output_path.mkdir(parents=True, exist_ok=True)
 
         for script_name, script in self.scripts.items():
+            if fmt == 'compact':
+                compact.dump(script.disasm, os.path.join(output_path, f"{script_name}{compact.EXTENSION}"))
+                continue
             file_path = os.path.join(output_path, f"{script_name}.json")
             with open(file_path, "w", encoding="UTF-8") as new_file:
                 json.dump(script.disasm, new_file, indent="\t", ensure_ascii=False)
 
+    @profiling.timed('disassemble')
     def disassemble(self):
-        handlers_table = {
-            'MESSAGE': self.message_handler,
-            'SELECT': self.select_handler,
-            'BATTLE': self.battle_handler,
-            'TASK': self.task_handler,
-            'CSAYAVOICETEXT': self.csayavoicetext_handler,
-            'VARSTR_SET': self.varstr_set_handler,
-            'GOTO': self.goto_handler,
-            'GOSUB': self.gosub_handler,
-            'JUMP': self.jump_handler,
-            'FARCALL': self.farcall_handler,
-            'IFN': self.ifn_ify_handler,
-            'IFY': self.ifn_ify_handler,
-            'RANDOM': self.random_handler,
-            # 'ADD': self.add_handler,  # for some reason it breaks some scripts
-            'IMAGELOAD': self.imageload_handler,
-        }
-
+        progress = events.Progress('disassemble', len(self.scripts))
         for script_name, script in self.scripts.items():
-            self.current_script = script_name
-            print(f'disassembling {self.current_script}')
-            for code in script.opcodes:
-                result = {
-                    'label': code.pos,
-                    'opcode': code.opstr,
-                    'flag': code.flag,
-                    'fixed_param': code.fixed_param
-                }
-                if code.opstr in handlers_table:
-                    result = handlers_table[code.opstr](code.param_bytes, result)
-                else:
-                    result['raw_args'] = code.param_bytes.hex()
-                # print(f'{code.opstr} {result}')
-                script.disasm.append(result)
-
+            self.disassemble_script(script)
+            progress.script(script_name, len(script.disasm), len(script.asm), cached=script.cached)
+        progress.finish()
+
+        if self.cache_path:
+            self.save_cache()
+
+    def disassemble_script(self, script: Script) -> None:
+        """Records of a parsed script, a cached one only adds its lookup entries."""
+        if script.cached:
+            self.lookup.add_script(script.name, script.disasm)
+            return
+        self.current_script = script.name
+        for code in script.opcodes:
+            result = {
+                'label': code.pos,
+                'opcode': code.opstr,
+                'flag': code.flag,
+                'fixed_param': code.fixed_param
+            }
+            code_handler = self.dispatch[code.opcode]
+            if code_handler is not None:
+                result = code_handler(self, code.param_bytes, result)
+            else:
+                result['raw_args'] = code.param_bytes.hex()
+            # print(f'{code.opstr} {result}')
+            self.strings.intern_values(result)
+            if code.opcode in self.lookup_bytes:
+                self.lookup.add(script.name, len(script.disasm), result)
+            script.disasm.append(result)
+
+    @handler('MESSAGE')
     def message_handler(self, param_bytes: bytes, result: dict) -> dict:
         en_coding = Charset.UTF_8 if not self.current_script.startswith('ミニゲ') else Charset.Unicode
         voice_id, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
@@ -192,8 +382,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def select_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('SELECT')
+    def select_handler(self, param_bytes: bytes, result: dict) -> dict:
         var_id, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         var0, start = helpers.get_param(params_bytes=param_bytes, type='uint16', start=start)
         var1, start = helpers.get_param(params_bytes=param_bytes, type='uint16', start=start)
@@ -214,8 +404,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def battle_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('BATTLE')
+    def battle_handler(self, param_bytes: bytes, result: dict) -> dict:
         battle_type, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         result['battle_type'] = battle_type
         if len(param_bytes) <= start:
@@ -296,8 +486,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def task_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('TASK')
+    def task_handler(self, param_bytes: bytes, result: dict) -> dict:
         task_type, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         result['task_type'] = task_type
         if len(param_bytes) <= start:
@@ -365,8 +555,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def csayavoicetext_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('CSAYAVOICETEXT')
+    def csayavoicetext_handler(self, param_bytes: bytes, result: dict) -> dict:
         voice_id, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         msg_jp, start = helpers.get_param(params_bytes=param_bytes, type='string', start=start, coding=Charset.Unicode, switch=True)
         msg_en, start = helpers.get_param(params_bytes=param_bytes, type='string', start=start, coding=Charset.Unicode, switch=True)
@@ -377,8 +567,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def varstr_set_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('VARSTR_SET')
+    def varstr_set_handler(self, param_bytes: bytes, result: dict) -> dict:
         varstr_id, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         varstr_str, start = helpers.get_param(params_bytes=param_bytes, type='string', start=start, coding=Charset.Unicode, switch=True)
         result.update({
@@ -387,8 +577,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def farcall_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('FARCALL')
+    def farcall_handler(self, param_bytes: bytes, result: dict) -> dict:
         index, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         filename, start = helpers.get_param(params_bytes=param_bytes, start=start, type='string', coding=Charset.ShiftJIS, switch=True)
         jump_pos, start = helpers.get_param(params_bytes=param_bytes, type='uint32', start=start)
@@ -404,16 +594,16 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def goto_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('GOTO')
+    def goto_handler(self, param_bytes: bytes, result: dict) -> dict:
         jump_pos, start = helpers.get_param(params_bytes=param_bytes, type='uint32')
         result.update({
             'jump_pos': jump_pos
         })
         return result
 
-    @staticmethod
-    def gosub_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('GOSUB')
+    def gosub_handler(self, param_bytes: bytes, result: dict) -> dict:
         arg1, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         jump_pos, start = helpers.get_param(params_bytes=param_bytes, type='uint32', start=start)
         end = None
@@ -426,8 +616,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def jump_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('JUMP')
+    def jump_handler(self, param_bytes: bytes, result: dict) -> dict:
         filename, start = helpers.get_param(params_bytes=param_bytes, type='string', coding=Charset.ShiftJIS, switch=True)
         jump_pos = None
         if len(param_bytes) > start:
@@ -438,8 +628,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def ifn_ify_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('IFN', 'IFY')
+    def ifn_ify_handler(self, param_bytes: bytes, result: dict) -> dict:
         condition, start = helpers.get_param(params_bytes=param_bytes, type='string', coding=Charset.ShiftJIS, switch=True)
         jump_pos, start = helpers.get_param(params_bytes=param_bytes, type='uint32', start=start)
         result.update({
@@ -448,8 +638,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def random_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('RANDOM')
+    def random_handler(self, param_bytes: bytes, result: dict) -> dict:
         var1, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         rnd_from, start = helpers.get_param(params_bytes=param_bytes, type='string', start=start, coding=Charset.ShiftJIS, switch=True)
         rnd_to, start = helpers.get_param(params_bytes=param_bytes, type='string', start=start, coding=Charset.ShiftJIS, switch=True)
@@ -460,8 +650,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def add_handler(param_bytes: bytes, result: dict) -> dict:
+    # @handler('ADD')  # for some reason it breaks some scripts
+    def add_handler(self, param_bytes: bytes, result: dict) -> dict:
         var1, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         expr, start = helpers.get_param(params_bytes=param_bytes, type='string', start=start, coding=Charset.ShiftJIS, switch=True)
         result.update({
@@ -470,8 +660,8 @@ class ScriptDisassembler:
         })
         return result
 
-    @staticmethod
-    def imageload_handler(param_bytes: bytes, result: dict) -> dict:
+    @handler('IMAGELOAD')
+    def imageload_handler(self, param_bytes: bytes, result: dict) -> dict:
         mode, start = helpers.get_param(params_bytes=param_bytes, type='uint16')
         image_id, start = helpers.get_param(params_bytes=param_bytes, type='uint16', start=start)
 
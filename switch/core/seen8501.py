@@ -5,9 +5,7 @@ from utils.helpers import Charset
 first_title = '困りまくりグランプリ'.encode('utf-16le')
 
 
-def disassemble(seen8501_path: str, disasm_path: str):
-    with open(seen8501_path, 'rb') as f:
-        data = f.read()
+def parse(data: bytes) -> list:
     result = []
     index = data.find(first_title) - 2  # header length
     result.append({
@@ -30,14 +28,12 @@ def disassemble(seen8501_path: str, disasm_path: str):
     result.append({
         'end': data[next:].hex()
     })
-    with open(disasm_path, "w", encoding="UTF-8") as new_file:
-        json.dump(result, new_file, indent="\t", ensure_ascii=False)
+    return result
 
 
-def assemble(disasm_path: str, repack_path: str):
+def build(data: list) -> bytes:
     result = bytes()
-    with open(disasm_path, 'r') as f:
-        data = json.loads(f.read())
+    data = list(data)
     header = bytes.fromhex(data.pop(0)['header'])
     end = bytes.fromhex(data.pop(-1)['end'])
 
@@ -46,9 +42,21 @@ def assemble(disasm_path: str, repack_path: str):
         result += helpers.pack_param(value=title['jp'], type='string', coding=Charset.Unicode, switch=True)
         result += helpers.pack_param(value=title['en'], type='string', coding=Charset.UTF_8, switch=True)
     result += end
+    return result
 
+
+def disassemble(seen8501_path: str, disasm_path: str):
+    with open(seen8501_path, 'rb') as f:
+        data = f.read()
+    with open(disasm_path, "w", encoding="UTF-8") as new_file:
+        json.dump(parse(data), new_file, indent="\t", ensure_ascii=False)
+
+
+def assemble(disasm_path: str, repack_path: str):
+    with open(disasm_path, 'r') as f:
+        data = json.loads(f.read())
     with open(repack_path, "wb") as new_file:
-        new_file.write(result)
+        new_file.write(build(data))
 
 
 if __name__ == '__main__':
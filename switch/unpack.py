@@ -6,15 +6,23 @@ from switch.core import seen8500, seen8501
 script_file = 'SCRIPT/SCRIPT_switch.PAK'
 unpack_folder = './SCRIPT/unpacked'
 disassembly_folder = './SCRIPT/disassembled'
+cache_folder = './SCRIPT/cache'
+xref_file = './SCRIPT/xref.json'
+lookup_file = './SCRIPT/lookup.json'
+snapshot_file = './SCRIPT/project.snap'
 
 # unpacking SCRIPT.PAK
 pak = PAKArchive(original_pak=script_file)
 pak.extract(output_dir=unpack_folder)
 
 # disassembling scripts
-disassembler = ScriptDisassembler(script_folder=unpack_folder)
+disassembler = ScriptDisassembler(script_folder=unpack_folder, cache_folder=cache_folder)
 disassembler.disassemble()
+print(disassembler.strings.summary())
 disassembler.save_disasm(result_folder=disassembly_folder)
+disassembler.build_xref().save(xref_file)
+disassembler.lookup.save(lookup_file)
+disassembler.save_snapshot(snapshot_file)
 # processing SEEN8500 and SEEN8501 files
 seen8500.disassemble(seen8500_path=f'{unpack_folder}/seen8500', disasm_path=f'{disassembly_folder}/seen8500.json')
 seen8501.disassemble(seen8501_path=f'{unpack_folder}/seen8501', disasm_path=f'{disassembly_folder}/seen8501.json')
@@ -0,0 +1,139 @@
+import json
+from bisect import bisect_right
+from collections import deque
+from typing import Callable, Dict, List, Mapping, Set, Tuple
+
+# jump and fall through to the next command (GOSUB/FARCALL return to it)
+BRANCH_OPCODES = {'IFN', 'IFY', 'GOSUB', 'FARCALL'}
+# never fall through
+STOP_OPCODES = {'GOTO', 'JUMP', 'RETURN', 'FARRETURN', 'END'}
+
+
+class ControlFlowGraph:
+    """
+    Basic blocks and edges of one script, built from its records.
+
+    A block starts at the first command, at every jump target and after every command that jumps
+    or stops. Edges go to the jump target inside the script (GOTO/GOSUB/IFN/IFY) and to the next
+    block unless the last command stops the flow; FARCALL/JUMP give far edges to (script, label),
+    label None meaning the start of the script.
+
+    SELECT and RANDOM only set variables, the branching itself is done by the following IFN/IFY.
+    ONGOTO is not decoded, so it is treated as an ordinary command.
+    """
+
+    def __init__(
+            self,
+            labels: List[int],
+            starts: List[int],
+            edges: List[List[int]],
+            far_edges: List[List[Tuple[str, int | None]]]
+    ):
+        self.labels = labels  # label of every command
+        self.starts = starts  # index of the first command of every block
+        self.edges = edges  # block -> successor blocks
+        self.far_edges = far_edges  # block -> [(script, label)]
+        self.index = {label: i for i, label in enumerate(labels)}
+
+    @classmethod
+    def build(cls, records: List[dict], resolve: Callable[[str], str]) -> 'ControlFlowGraph':
+        """resolve turns a JUMP/FARCALL filename into a script name."""
+        labels = [cmd['label'] for cmd in records]
+        index = {label: i for i, label in enumerate(labels)}
+
+        leaders = {0} if records else set()
+        for i, cmd in enumerate(records):
+            target = cmd.get('jump_pos')
+            if target is not None and 'filename' not in cmd and target in index:
+                leaders.add(index[target])
+            if (cmd['opcode'] in BRANCH_OPCODES or cmd['opcode'] in STOP_OPCODES) and i + 1 < len(records):
+                leaders.add(i + 1)
+        starts = sorted(leaders)
+
+        edges, far_edges = [], []
+        for block, start in enumerate(starts):
+            end = starts[block + 1] if block + 1 < len(starts) else len(records)
+            cmd = records[end - 1]
+            successors, far = [], []
+            target = cmd.get('jump_pos')
+            if 'filename' in cmd and cmd['opcode'] in ('JUMP', 'FARCALL'):
+                far.append((resolve(cmd['filename']), target))
+            elif target is not None and target in index:
+                successors.append(bisect_right(starts, index[target]) - 1)
+            if cmd['opcode'] not in STOP_OPCODES and block + 1 < len(starts):
+                successors.append(block + 1)
+            edges.append(successors)
+            far_edges.append(far)
+        return cls(labels, starts, edges, far_edges)
+
+    def block_labels(self, block: int, first: int | None = None) -> List[int]:
+        """Labels of the block's commands, from the command with index first if given."""
+        end = self.starts[block + 1] if block + 1 < len(self.starts) else len(self.labels)
+        return self.labels[self.starts[block] if first is None else first:end]
+
+    def reachable(self, label: int) -> Tuple[Set[int], Set[Tuple[str, int | None]]]:
+        """Labels reachable inside the script from the command at label, and far targets on the way."""
+        first = self.index[label]
+        block = bisect_right(self.starts, first) - 1
+        labels = set(self.block_labels(block, first))
+        far = set(self.far_edges[block])
+        visited = set()
+        queue = deque(self.edges[block])
+        while queue:
+            block = queue.popleft()
+            if block in visited:
+                continue
+            visited.add(block)
+            labels.update(self.block_labels(block))
+            far.update(self.far_edges[block])
+            queue.extend(self.edges[block])
+        return labels, far
+
+    def to_dict(self) -> dict:
+        return {
+            'labels': self.labels,
+            'starts': self.starts,
+            'edges': self.edges,
+            'far_edges': self.far_edges
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ControlFlowGraph':
+        far_edges = [[(script_name, label) for script_name, label in far] for far in data['far_edges']]
+        return cls(data['labels'], data['starts'], data['edges'], far_edges)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'ControlFlowGraph':
+        with open(path, 'r', encoding='UTF-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def reachable(
+        cfgs: Mapping[str, ControlFlowGraph],
+        script_name: str,
+        label: int,
+        follow_far: bool = True
+) -> Dict[str, Set[int]]:
+    """Labels reachable from script_name:label in every script, following FARCALL/JUMP if follow_far."""
+    result: Dict[str, Set[int]] = {}
+    queue = deque([(script_name, label)])
+    seen = set()
+    while queue:
+        script_name, label = queue.popleft()
+        cfg = cfgs.get(script_name)
+        if cfg is None or not cfg.labels:
+            continue
+        if label is None:
+            label = cfg.labels[0]
+        if (script_name, label) in seen or label not in cfg.index:
+            continue
+        seen.add((script_name, label))
+        labels, far = cfg.reachable(label)
+        result.setdefault(script_name, set()).update(labels)
+        if follow_far:
+            queue.extend(far)
+    return result
@@ -0,0 +1,83 @@
+"""
+Compact on-disk format for disassembled scripts, meant for build caches and CI artifacts.
+Pretty JSON stays the format for human editing.
+
+1. record stream (NAME.bin):
+   - magic (4 bytes): b'LBDC'
+   - format version (1 byte)
+   - marshal version (1 byte): the stream is only read back by the same marshal version
+   - length (4 bytes) + marshal-encoded records
+
+2. sidecar blob (NAME.blob):
+   - raw payloads of hex fields (raw_args, end) stored as bytes
+   - in the record stream such a field holds (offset, length) into the blob
+
+Records are dicts, so marshal keeps repeated field names as references and (de)serialises
+the whole stream in C. Not meant for untrusted input.
+"""
+import marshal
+import struct
+from pathlib import Path
+from typing import List, Tuple
+
+MAGIC = b'LBDC'
+VERSION = 1
+EXTENSION = '.bin'
+BLOB_EXTENSION = '.blob'
+PAYLOAD_FIELDS = ('raw_args', 'end')
+
+
+def encode(records: List[dict]) -> Tuple[bytes, bytes]:
+    """Return the record stream and the sidecar blob."""
+    blob = bytearray()
+    rows = []
+    with_payload = []  # indexes of records referencing the blob
+    for index, record in enumerate(records):
+        fields = [field for field in PAYLOAD_FIELDS if record.get(field) is not None]
+        if fields:
+            record = dict(record)
+            for field in fields:
+                payload = bytes.fromhex(record[field])
+                record[field] = (len(blob), len(payload))
+                blob += payload
+            with_payload.append(index)
+        rows.append(record)
+
+    body = marshal.dumps((rows, with_payload))
+    header = MAGIC + struct.pack('<BBI', VERSION, marshal.version, len(body))
+    return header + body, bytes(blob)
+
+
+def decode(data: bytes, blob: bytes) -> List[dict]:
+    if data[:4] != MAGIC:
+        raise ValueError('not a compact disassembly file')
+    version, marshal_version, length = struct.unpack_from('<BBI', data, 4)
+    if (version, marshal_version) != (VERSION, marshal.version):
+        raise ValueError(f'unsupported compact format version {version}/{marshal_version}')
+
+    rows, with_payload = marshal.loads(data[10:10 + length])
+    blob = memoryview(blob)
+    for index in with_payload:
+        record = rows[index]
+        for field in PAYLOAD_FIELDS:
+            value = record.get(field)
+            if value is not None:
+                record[field] = blob[value[0]:value[0] + value[1]].hex()
+    return rows
+
+
+def dump(records: List[dict], path: str) -> None:
+    """Write records to path (NAME.bin) and the sidecar blob next to it (NAME.blob)."""
+    data, blob = encode(records)
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(Path(path).with_suffix(BLOB_EXTENSION), 'wb') as f:
+        f.write(blob)
+
+
+def load(path: str) -> List[dict]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(Path(path).with_suffix(BLOB_EXTENSION), 'rb') as f:
+        blob = f.read()
+    return decode(data, blob)
@@ -0,0 +1,111 @@
+"""
+Progress and metrics events of the pipeline, sent to every subscriber as a dict:
+
+    {'event': 'script', 'phase': 'parse', 'script': 'SEEN0001', 'commands': 2003, 'bytes': 80340,
+     'seconds': 0.012, 'cached': False, 'done': 1, 'total': 20, 'total_commands': 2003,
+     'total_bytes': 80340, 'elapsed': 0.012, 'commands_per_s': 166916.7, 'time': 1760000000.0}
+    {'event': 'phase', 'phase': 'parse', 'scripts': 20, 'commands': 40060, 'bytes': 1606800,
+     'seconds': 0.24, 'commands_per_s': 166916.7, 'mb_per_s': 6.4, 'time': 1760000000.2}
+
+Phases are parse, disassemble, layout and emit. The console output is the print_event subscriber,
+JsonLinesSink writes the events to a file for other tools (e.g. CI dashboards).
+"""
+import json
+import sys
+import time
+from typing import Callable, List, TextIO
+
+subscribers: List[Callable[[dict], None]] = []
+
+# console lines of the script events
+PRINT_FORMATS = {
+    'parse': 'parse {script}',
+    'disassemble': 'disassembling {script}',
+    'layout': 'calculate offsets for {script}',
+    'emit': 'assembling {script}'
+}
+
+
+def subscribe(subscriber: Callable[[dict], None]) -> Callable[[dict], None]:
+    if subscriber not in subscribers:
+        subscribers.append(subscriber)
+    return subscriber
+
+
+def unsubscribe(subscriber: Callable[[dict], None]) -> None:
+    if subscriber in subscribers:
+        subscribers.remove(subscriber)
+
+
+def emit(event: str, **fields) -> None:
+    if not subscribers:
+        return
+    record = {'event': event, **fields, 'time': time.time()}
+    for subscriber in list(subscribers):
+        subscriber(record)
+
+
+def print_event(record: dict) -> None:
+    if record['event'] != 'script':
+        return
+    if record['cached']:
+        print(f'{record["script"]} is taken from the cache')
+    else:
+        print(PRINT_FORMATS.get(record['phase'], '{phase} {script}').format(**record))
+
+
+class JsonLinesSink:
+    """Subscriber writing one JSON object per event to path ('-' is stdout)."""
+    def __init__(self, path: str):
+        self.file: TextIO = sys.stdout if path == '-' else open(path, 'a', encoding='UTF-8')
+
+    def __call__(self, record: dict) -> None:
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()  # a dashboard can follow the file while the build runs
+
+    def close(self) -> None:
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class Progress:
+    """Script events of one phase with running totals, then one phase event."""
+    def __init__(self, phase: str, total: int):
+        self.phase = phase
+        self.total = total
+        self.done = 0
+        self.commands = 0
+        self.bytes = 0
+        self.start = self.script_start = time.perf_counter()
+
+    def begin(self) -> None:
+        """Mark the start of the next script (the end of the previous one is the default)."""
+        self.script_start = time.perf_counter()
+
+    def script(self, script_name: str, commands: int, size: int, cached: bool = False) -> None:
+        now = time.perf_counter()
+        self.done += 1
+        self.commands += commands
+        self.bytes += size
+        if subscribers:
+            elapsed = now - self.start
+            emit(
+                'script', phase=self.phase, script=script_name, commands=commands, bytes=size,
+                seconds=now - self.script_start, cached=cached, done=self.done, total=self.total,
+                total_commands=self.commands, total_bytes=self.bytes, elapsed=elapsed,
+                commands_per_s=self.commands / elapsed if elapsed else None
+            )
+        self.script_start = now
+
+    def finish(self) -> None:
+        if not subscribers:
+            return
+        seconds = time.perf_counter() - self.start
+        emit(
+            'phase', phase=self.phase, scripts=self.done, commands=self.commands, bytes=self.bytes, seconds=seconds,
+            commands_per_s=self.commands / seconds if seconds else None,
+            mb_per_s=self.bytes / 2 ** 20 / seconds if seconds else None
+        )
+
+
+subscribe(print_event)  # console output by default
@@ -1,6 +1,7 @@
 import codecs
+import fnmatch
 import struct
-from typing import List, Tuple, Union
+from typing import Callable, Iterable, List, Tuple, Union
 from enum import Enum
 
 
@@ -140,3 +141,26 @@ def pack_param(
             return encoded
         case _:
             raise ValueError(f"Unsupported type: {type}")
+
+
+def handler(*opcodes: str):
+    """Register the decorated method as the handler of the given opcodes (see build_dispatch)."""
+    def decorator(func):
+        func.handles = opcodes
+        return func
+    return decorator
+
+
+def build_dispatch(cls, opcodes: List[str]) -> List[Callable | None]:
+    """Handlers of cls indexed by opcode byte (line number in the opcode table), None for unhandled opcodes."""
+    handlers = {}
+    for name in dir(cls):
+        for opcode in getattr(getattr(cls, name), 'handles', ()):
+            handlers[opcode] = getattr(cls, name)
+    return [handlers.get(opcode) for opcode in opcodes]
+
+
+def name_matches(name: str, patterns: Iterable[str]) -> bool:
+    """Case-insensitive match of a script name against names or glob patterns (SEEN05*, seen0514)."""
+    name = name.lower()
+    return any(fnmatch.fnmatchcase(name, pattern.lower()) for pattern in patterns)
@@ -0,0 +1,63 @@
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict
+
+
+class LabelTable:
+    """
+    New labels (offsets) of the commands of one script by command index, with their original labels:
+    two arrays of uint32 instead of a dict entry per command, since the label_map of the whole corpus
+    is kept between the assembler passes.
+
+    Original labels are looked up by binary search while they ascend, as in disassembled scripts;
+    records that break the order (e.g. inserted by hand) switch the table to a dict index.
+    For equal labels the last command wins.
+    """
+    __slots__ = ('labels', 'offsets', 'index')
+
+    def __init__(self):
+        self.labels: array | list = array('I')  # original label of every command
+        self.offsets = array('I')  # new label of every command
+        self.index: Dict[Any, int] | None = None  # original label -> command index, once labels don't ascend
+
+    def append(self, label: Any, offset: int) -> None:
+        if self.index is None and not (
+                type(label) is int and 0 <= label <= 0xFFFFFFFF and (not self.labels or label >= self.labels[-1])
+        ):
+            self.labels = list(self.labels)
+            self.index = {original: i for i, original in enumerate(self.labels)}
+        if self.index is not None:
+            self.index[label] = len(self.labels)
+        self.labels.append(label)
+        self.offsets.append(offset)
+
+    def position(self, label: Any) -> int:
+        """Index of the command with the original label, KeyError if there is none."""
+        if self.index is not None:
+            return self.index[label]
+        if type(label) is not int:
+            raise KeyError(label)
+        i = bisect_right(self.labels, label) - 1
+        if i < 0 or self.labels[i] != label:
+            raise KeyError(label)
+        return i
+
+    def __getitem__(self, label: Any) -> int:
+        return self.offsets[self.position(label)]
+
+    def __contains__(self, label: Any) -> bool:
+        try:
+            self.position(label)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def copy(self) -> 'LabelTable':
+        table = LabelTable()
+        table.labels = self.labels[:]
+        table.offsets = self.offsets[:]
+        table.index = dict(self.index) if self.index is not None else None
+        return table
@@ -0,0 +1,61 @@
+import json
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+
+class LookupIndex:
+    """
+    Index of voice and image ids: id -> (script, label, index) of every record using it,
+    index being the position of the record in the script's records.
+
+    The lookup file keeps script names in a table and every location as three numbers:
+    {"scripts": [...], "voice_id": {"id": [script, label, index, ...]}, "image_id": {...}}
+    """
+    fields = ('voice_id', 'image_id')
+    none_values = {'voice_id': 0}  # voice_id 0 is a line without voice, not indexed
+
+    def __init__(self):
+        self.entries: Dict[str, Dict[int, List[Tuple[str, int, int]]]] = {
+            field: defaultdict(list) for field in self.fields
+        }
+
+    def add(self, script_name: str, index: int, record: dict) -> None:
+        for field in self.fields:
+            value = record.get(field)
+            if value is not None and value != self.none_values.get(field):
+                self.entries[field][value].append((script_name, record['label'], index))
+
+    def add_script(self, script_name: str, records: Iterable[dict]) -> None:
+        for index, record in enumerate(records):
+            self.add(script_name, index, record)
+
+    def voice(self, voice_id: int) -> List[Tuple[str, int, int]]:
+        return list(self.entries['voice_id'].get(voice_id, []))
+
+    def image(self, image_id: int) -> List[Tuple[str, int, int]]:
+        return list(self.entries['image_id'].get(image_id, []))
+
+    def save(self, path: str) -> None:
+        script_ids = {}
+        data = {}
+        for field, entries in self.entries.items():
+            data[field] = {}
+            for value, locations in sorted(entries.items()):
+                flat = data[field][value] = []
+                for script_name, label, index in locations:
+                    flat += (script_ids.setdefault(script_name, len(script_ids)), label, index)
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump({'scripts': list(script_ids), **data}, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'LookupIndex':
+        with open(path, 'r', encoding='UTF-8') as f:
+            data = json.load(f)
+        lookup = cls()
+        scripts = data['scripts']
+        for field in cls.fields:
+            for value, flat in data.get(field, {}).items():
+                lookup.entries[field][int(value)] = [
+                    (scripts[flat[i]], flat[i + 1], flat[i + 2]) for i in range(0, len(flat), 3)
+                ]
+        return lookup
@@ -1,7 +1,12 @@
+import functools
 import struct
-from typing import List, Dict
+from bisect import bisect_right
+from collections import Counter
+from typing import Callable, List, Dict, Mapping
 from pathlib import Path
 
+from utils import profiling
+
 
 class PAKArchive:
     """
@@ -48,6 +53,30 @@ class PAKArchive:
         self.header: Dict[str, any] = {}
         self.read_header()
 
+    @classmethod
+    @profiling.timed('pack')
+    def create(cls, output_path: str, files: Mapping[str, bytes], block_size: int = 16) -> 'PAKArchive':
+        """Create a new PAK file from scratch (e.g. for synthetic scripts), files in the given order."""
+        file_names = b''.join(name.encode('utf-8') + b'\x00' for name in files)
+        file_names_offset = 0x28 + 8 * len(files)
+        header_size = -(-(file_names_offset + len(file_names)) // block_size) * block_size
+
+        with open(output_path, 'wb') as new_file:
+            new_file.write(struct.pack(
+                '<8I4BI', header_size, len(files), 0, block_size, 0, 0, 0, 0, 0, 0, 0, 0, file_names_offset
+            ))
+            offset = header_size // block_size
+            for data in files.values():
+                new_file.write(struct.pack('<II', offset, len(data)))
+                offset += -(-len(data) // block_size)
+            new_file.write(file_names)
+            new_file.write(b'\x00' * (header_size - new_file.tell()))
+            for data in files.values():
+                new_file.write(data)
+                new_file.write(b'\x00' * (-len(data) % block_size))
+        return cls(original_pak=output_path)
+
+    @profiling.timed('read_header')
     def read_header(self) -> None:
         """Read and parse the PAK file header."""
         with open(self.file_path, 'rb') as file:
@@ -96,6 +125,29 @@ class PAKArchive:
         """Return a list of all file names in the PAK."""
         return [file_info['name'] for file_info in self.files]
 
+    @functools.cached_property
+    def files_by_name(self) -> Dict[str, Dict[str, any]]:
+        return {file_info['name']: file_info for file_info in self.files}
+
+    def read_file(self, name: str) -> bytes:
+        """Read one entry, with its own file handle (so entries can be read from several threads)."""
+        file_info = self.files_by_name[name]
+        with open(self.file_path, 'rb') as pak_file:
+            pak_file.seek(file_info['offset'])
+            return pak_file.read(file_info['size'])
+
+    @profiling.timed('extract')
+    def read_files(self, names: List[str]) -> Dict[str, bytes]:
+        """Read the given entries straight from the archive."""
+        result = {}
+        with open(self.file_path, 'rb') as pak_file:
+            for name in names:
+                file_info = self.files_by_name[name]
+                pak_file.seek(file_info['offset'])
+                result[name] = pak_file.read(file_info['size'])
+        return result
+
+    @profiling.timed('extract')
     def extract(self, output_dir: str) -> None:
         """Extract all files from the archive."""
         output_path = Path(output_dir)
@@ -121,25 +173,101 @@ class PAKArchive:
         with open(input_path.joinpath('file_list.txt'), 'r', encoding='utf-8') as f:
             filenames = [line.strip().split("\t")[0] for line in f]
 
-        input_path = Path(input_dir)
+        if len(filenames) != self.header['file_count']:
+            raise ValueError(f'File count mismatch. Expected: {self.file_count}, got: {len(filenames)}')
+
+        file_sizes = [(input_path / f'{filename}').stat().st_size for filename in filenames]
+
+        def read_file(filename: str) -> bytes:
+            with open(input_path / filename, 'rb') as input_file:
+                return input_file.read()
+
+        self._write_pak(output_path, filenames, file_sizes, read_file)
 
+    def build_pak(self, output_path: str, files: Mapping[str, bytes]):
+        """
+        Create a new PAK file with the contents of files (name -> data) in place of the original entries,
+        the remaining entries are copied from the original archive.
+        """
+        unknown = set(files) - set(self.file_list)
+        if unknown:
+            raise ValueError(f'Files not in the archive: {", ".join(sorted(unknown))}')
+
+        file_sizes = [
+            len(files[file_info['name']]) if file_info['name'] in files else file_info['size']
+            for file_info in self.files
+        ]
+        with open(self.file_path, 'rb') as pak_file:
+            files_by_name = {file_info['name']: file_info for file_info in self.files}
+
+            def read_file(filename: str) -> bytes:
+                if filename in files:
+                    return files[filename]
+                pak_file.seek(files_by_name[filename]['offset'])
+                return pak_file.read(files_by_name[filename]['size'])
+
+            self._write_pak(output_path, self.file_list, file_sizes, read_file)
+
+    def writer(self, output_path: str) -> 'PAKWriter':
+        """Writer of a new PAK with the entries of this archive, their data given one by one (see PAKWriter)."""
+        return PAKWriter(self, output_path)
+
+    @profiling.timed('pack')
+    def patch(self, files: Mapping[str, bytes]) -> bool:
+        """
+        Replace entries of this archive in place when each new content fits into the space of the old one
+        (up to the next entry, the last entry may grow); otherwise return False and leave the archive as is.
+        Entries sharing their offset with another one (e.g. empty ones) have no space of their own.
+        """
+        files_by_name = {file_info['name']: (i, file_info) for i, file_info in enumerate(self.files)}
+        entries_at = Counter(file_info['offset'] for file_info in self.files)
+        starts = sorted(entries_at)
+        block_size = self.header['block_size']
+        capacities = {}  # name -> bytes up to the next entry, None for the last entry
+        for name, data in files.items():
+            offset = files_by_name[name][1]['offset']
+            if entries_at[offset] > 1:
+                capacities[name] = 0
+            else:
+                next_index = bisect_right(starts, offset)
+                capacities[name] = starts[next_index] - offset if next_index < len(starts) else None
+            if capacities[name] is not None and len(data) > capacities[name]:
+                return False
+
+        with open(self.file_path, 'r+b') as pak_file:
+            for name, data in files.items():
+                i, file_info = files_by_name[name]
+                old_end = file_info['offset'] + file_info['size'] + (-file_info['size'] % block_size)
+                new_end = file_info['offset'] + len(data) + (-len(data) % block_size)
+                pak_file.seek(file_info['offset'])
+                pak_file.write(data)
+                pak_file.write(b'\x00' * (max(old_end, new_end) - pak_file.tell()))
+                if capacities[name] is None:
+                    pak_file.truncate(new_end)
+                # size in the file table
+                pak_file.seek(0x28 + 8 * i + 4)
+                pak_file.write(struct.pack('<I', len(data)))
+                file_info['size'] = len(data)
+        return True
+
+    @profiling.timed('pack')
+    def _write_pak(
+            self,
+            output_path: str,
+            filenames: List[str],
+            file_sizes: List[int],
+            read_file: Callable[[str], bytes]
+    ) -> None:
         # read header from the original PAK file
         with open(self.file_path, 'rb') as original_file:
             header = original_file.read(0x28)
             header_size = struct.unpack('<I', header[:4])[0]
 
-        if len(filenames) != self.header['file_count']:
-            raise ValueError(f'File count mismatch. Expected: {self.file_count}, got: {len(filenames)}')
-
-        # calculate file sizes and offsets
-        file_sizes = []
+        # calculate file offsets
         file_offsets = []
         current_offset = header_size // self.header['block_size']
 
-        for filename in filenames:
-            file_path = input_path / f'{filename}'
-            file_size = file_path.stat().st_size
-            file_sizes.append(file_size)
+        for file_size in file_sizes:
             file_offsets.append(current_offset)
             current_offset += -(-file_size // self.header['block_size'])
 
@@ -159,9 +287,7 @@ class PAKArchive:
 
             # write file data
             for filename, size in zip(filenames, file_sizes):
-                file_path = f'{input_path}/{filename}'
-                with open(file_path, 'rb') as input_file:
-                    data = input_file.read()
+                data = read_file(filename)
                 new_file.write(data)
                 padding = -size % self.header['block_size']
                 new_file.write(b'\x00' * padding)
@@ -172,6 +298,69 @@ class PAKArchive:
             # new_file.write(b'\x00' * final_padding)
 
 
+class PAKWriter:
+    """
+    Writes a PAK with the header and the entries of archive while the data of the entries comes in,
+    in the order of the archive: the file table is written last (by close), when all sizes are known,
+    so the entries need not be in memory at once. The result is the same as of PAKArchive.build_pak.
+
+        with pak.writer('SCRIPT_repacked.PAK') as writer:
+            for name in pak.file_list:
+                writer.write(name, data)
+    """
+
+    def __init__(self, archive: PAKArchive, output_path: str):
+        self.archive = archive
+        self.block_size = archive.header['block_size']
+        self.file_sizes: List[int] = []
+
+        # read header from the original PAK file
+        with open(archive.file_path, 'rb') as original_file:
+            header = original_file.read(0x28)
+            self.header_size = struct.unpack('<I', header[:4])[0]
+
+        self.file = open(output_path, 'wb')
+        self.file.write(header)
+        self.file.write(b'\x00' * 8 * len(archive.files))  # file table, see close()
+        for filename in archive.file_list:
+            self.file.write(filename.encode('utf-8') + b'\x00')
+        self.file.write(b'\x00' * (self.header_size - self.file.tell()))
+
+    def write(self, name: str, data: bytes) -> None:
+        index = len(self.file_sizes)
+        expected = self.archive.files[index]['name'] if index < len(self.archive.files) else None
+        if name != expected:
+            raise ValueError(f'Entry {index} of the archive is {expected}, got {name}')
+        self.file.write(data)
+        self.file.write(b'\x00' * (-len(data) % self.block_size))
+        self.file_sizes.append(len(data))
+
+    @profiling.timed('pack')
+    def close(self) -> None:
+        """Write the file table and close the file; all entries must be written."""
+        if self.file.closed:
+            return
+        try:
+            if len(self.file_sizes) != len(self.archive.files):
+                raise ValueError(f'{len(self.file_sizes)} of {len(self.archive.files)} entries written')
+            self.file.seek(0x28)
+            current_offset = self.header_size // self.block_size
+            for size in self.file_sizes:
+                self.file.write(struct.pack('<II', current_offset, size))
+                current_offset += -(-size // self.block_size)
+        finally:
+            self.file.close()
+
+    def __enter__(self) -> 'PAKWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:  # the file is left incomplete
+            self.file.close()
+
+
 if __name__ == '__main__':
     pak = PAKArchive(original_pak='SCRIPT_steam.PAK')
     pak.extract(output_dir='./unpacked')
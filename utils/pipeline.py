@@ -0,0 +1,68 @@
+"""
+Overlapped read -> process -> write pipeline on asyncio, for slow (e.g. network) storage:
+
+    pipeline.run(names, read=pak.read_file, process=decode, write=save)
+
+read runs in a thread pool, up to depth items ahead of processing; process runs in the calling
+thread, item by item in the given order; write runs in the thread pool too, one item at a time and
+in order (so it can append to a single file), up to depth results behind processing. Both queues
+are bounded: a slow reader stalls processing, a slow writer stalls processing and with it reading,
+so memory stays at about 2 * depth items.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+DONE = object()
+
+
+async def overlap(
+        items: Iterable[Any],
+        read: Callable[[Any], Any] | None,
+        process: Callable[[Any, Any], Any],
+        write: Callable[[Any, Any], None] | None = None,
+        depth: int = 8,
+        workers: int = 4
+) -> None:
+    loop = asyncio.get_running_loop()
+    reads: asyncio.Queue = asyncio.Queue(maxsize=depth)  # items with their pending reads
+    writes: asyncio.Queue = asyncio.Queue(maxsize=depth)  # items with their results
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        async def reader() -> None:
+            for item in items:
+                await reads.put((item, loop.run_in_executor(executor, read, item) if read else None))
+            await reads.put(DONE)
+
+        async def processor() -> None:
+            while (entry := await reads.get()) is not DONE:
+                item, data = entry
+                result = process(item, await data if data is not None else None)
+                if write is not None:
+                    await writes.put((item, result))
+            await writes.put(DONE)
+
+        async def writer() -> None:
+            while (entry := await writes.get()) is not DONE:
+                await loop.run_in_executor(executor, write, *entry)
+
+        # an error in one stage cancels the others and is raised as it is
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(reader())
+                group.create_task(processor())
+                group.create_task(writer())
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0] from None
+
+
+def run(
+        items: Iterable[Any],
+        read: Callable[[Any], Any] | None,
+        process: Callable[[Any, Any], Any],
+        write: Callable[[Any, Any], None] | None = None,
+        depth: int = 8,
+        workers: int = 4
+) -> None:
+    """Run the pipeline to the end (see overlap), from synchronous code."""
+    asyncio.run(overlap(items, read, process, write, depth, workers))
@@ -0,0 +1,181 @@
+"""
+Wall time, CPU time and peak memory of the pipeline phases and of every opcode handler.
+
+Phases are marked in the code with @timed('parse') or `with phase('layout'):`, they cost nothing
+until a profiler is started:
+
+    with Profiler(instrument=(ScriptDisassembler, ScriptAssembler), cprofile='build.prof') as profiler:
+        ...
+    print(profiler.report())
+
+Hooks (profiler.hooks) are called with (phase, wall seconds, cpu seconds, peak bytes or None)
+whenever a phase ends, e.g. to send the timings somewhere else.
+"""
+import contextlib
+import cProfile
+import functools
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+PHASES = ('read_header', 'extract', 'parse', 'disassemble', 'layout', 'emit', 'save', 'pack')
+
+active: 'Profiler | None' = None  # profiler the marked phases report to
+
+
+class Stats:
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak: int | None = None  # bytes, the highest of all calls
+
+    def add(self, wall: float, cpu: float, peak: int | None = None) -> None:
+        self.calls += 1
+        self.wall += wall
+        self.cpu += cpu
+        if peak is not None:
+            self.peak = max(self.peak or 0, peak)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'calls': self.calls, 'seconds': self.wall, 'cpu_seconds': self.cpu, 'peak_memory_bytes': self.peak}
+
+
+class Profiler:
+    """
+    Collects phase and handler timings while started (also as a context manager). instrument are
+    disassembler/assembler classes whose opcode handlers are timed, memory traces allocations
+    (slows the code down), cprofile is a file for the cProfile statistics of the whole run.
+    """
+    def __init__(self, instrument: Iterable[type] = (), memory: bool = True, cprofile: str | None = None):
+        self.instrument = list(instrument)
+        self.memory = memory
+        self.cprofile = cprofile
+        self.phases: Dict[str, Stats] = {}
+        self.handlers: Dict[str, Stats] = {}  # 'disassembler.MESSAGE' -> stats
+        self.hooks: List[Callable[[str, float, float, int | None], None]] = []
+        self.peaks: List[int] = []  # peaks of the open phases
+        self.dispatch: Dict[type, list] = {}  # original dispatch tables
+        self.profile: cProfile.Profile | None = None
+
+    def start(self) -> 'Profiler':
+        global active
+        active = self
+        for cls in self.instrument:
+            cls.load_opcodes()
+            self.dispatch[cls] = cls.dispatch
+            kind = cls.__module__.rsplit('.', 1)[-1]
+            # disassemblers map opcode bytes to names, assemblers names to bytes
+            names = {byte: name for name, byte in cls.opcodes.items()} if kind == 'assembler' else cls.opcodes
+            cls.dispatch = [
+                self.timed_handler(f'{kind}.{names[byte]}', func) if func is not None else None
+                for byte, func in enumerate(cls.dispatch)
+            ]
+        if self.memory:
+            tracemalloc.start()
+        if self.cprofile:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+
+    def stop(self) -> None:
+        global active
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.cprofile)
+            self.profile = None
+        if self.memory:
+            tracemalloc.stop()
+        for cls, dispatch in self.dispatch.items():
+            cls.dispatch = dispatch
+        self.dispatch.clear()
+        if active is self:
+            active = None
+
+    def __enter__(self) -> 'Profiler':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        memory = self.memory and tracemalloc.is_tracing()
+        if memory:
+            # tracemalloc has one peak: the enclosing phase keeps its peak so far on the stack
+            if self.peaks:
+                self.peaks[-1] = max(self.peaks[-1], tracemalloc.get_traced_memory()[1])
+            self.peaks.append(0)
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            peak = None
+            if memory:
+                peak = max(self.peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self.peaks:
+                    self.peaks[-1] = max(self.peaks[-1], peak)
+                tracemalloc.reset_peak()
+            self.phases.setdefault(name, Stats()).add(wall, cpu, peak)
+            for hook in self.hooks:
+                hook(name, wall, cpu, peak)
+
+    def timed_handler(self, name: str, func: Callable) -> Callable:
+        stats = self.handlers.setdefault(name, Stats())
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                return func(*args)
+            finally:
+                stats.add(time.perf_counter() - wall, time.process_time() - cpu)
+        return wrapper
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'phases': {name: stats.to_dict() for name, stats in self.phases.items()},
+            'handlers': {name: stats.to_dict() for name, stats in self.handlers.items() if stats.calls}
+        }
+
+    def report(self, handlers: int = 15) -> str:
+        """Table of the phases (in pipeline order) and of the slowest handlers."""
+        lines = [f'{"phase":<28} {"calls":>8} {"wall ms":>10} {"cpu ms":>10} {"peak MB":>9}']
+        order = {name: index for index, name in enumerate(PHASES)}
+        for name in sorted(self.phases, key=lambda name: order.get(name, len(order))):
+            lines.append(self.format_line(name, self.phases[name]))
+        slowest = sorted((item for item in self.handlers.items() if item[1].calls), key=lambda item: -item[1].wall)
+        if slowest:
+            lines.append(f'{"handler":<28} {"calls":>8} {"wall ms":>10} {"cpu ms":>10}')
+            lines.extend(self.format_line(name, stats) for name, stats in slowest[:handlers])
+        return '\n'.join(lines)
+
+    @staticmethod
+    def format_line(name: str, stats: Stats) -> str:
+        return (
+            f'{name:<28} {stats.calls:>8} {stats.wall * 1000:>10.1f} {stats.cpu * 1000:>10.1f}'
+            + (f' {stats.peak / 2 ** 20:>9.1f}' if stats.peak is not None else '')
+        )
+
+
+_untimed = contextlib.nullcontext()
+
+
+def phase(name: str) -> contextlib.AbstractContextManager:
+    """Context manager timing a phase for the active profiler, if there is one."""
+    return _untimed if active is None else active.phase(name)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """Decorator marking a function as a phase (a function called inside a phase is a nested phase)."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if active is None:
+                return func(*args, **kwargs)
+            with active.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,119 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Tuple
+from utils import cfg
+
+ANY = '*'
+
+
+class Step:
+    """
+    One command of a pattern: its opcode (ANY for every opcode) and the values of decoded fields,
+    either as a value to compare with or as a predicate called with the field's value.
+    where is a predicate called with the whole record.
+
+        Step('MESSAGE', voice_id=0)
+        Step('BATTLE', battle_type=102)
+        Step('IFN', condition=lambda condition: 'a==1' in condition)
+    """
+    def __init__(self, opcode: str = ANY, where: Callable[[dict], bool] | None = None, **fields: Any):
+        self.opcode = opcode
+        self.where = where
+        self.fields = fields
+
+    def matches(self, record: dict) -> bool:
+        if self.opcode != ANY and record['opcode'] != self.opcode:
+            return False
+        for field, expected in self.fields.items():
+            value = record.get(field)
+            if not (expected(value) if callable(expected) else value == expected):
+                return False
+        return self.where is None or self.where(record)
+
+
+class QueryIndex:
+    """
+    Pattern queries over records of all scripts (script name -> records or disassembler's Script objects).
+
+    Positions of every opcode are indexed once per script, so a query only looks at the commands
+    with the opcodes of its steps: IMAGELOAD followed by MESSAGE without a voice is
+
+        index.find(Step('IMAGELOAD'), Step('MESSAGE', voice_id=0))
+
+    and with within=N every next step may come up to N commands after the previous one.
+    Patterns spanning jumps, like SELECT whose choices lead to BATTLE 102, go through the control
+    flow graphs:
+
+        index.reaching(cfgs, Step('SELECT'), Step('BATTLE', battle_type=102))
+    """
+    def __init__(self, scripts: Mapping[str, Iterable[dict]]):
+        self.scripts: Dict[str, List[dict]] = {}
+        self.positions: Dict[str, Dict[str, List[int]]] = defaultdict(dict)
+        for script_name, records in scripts.items():
+            records = self.scripts[script_name] = list(getattr(records, 'disasm', records))
+            for index, record in enumerate(records):
+                self.positions[record['opcode']].setdefault(script_name, []).append(index)
+
+    def count(self, opcode: str) -> int:
+        return sum(len(indexes) for indexes in self.positions.get(opcode, {}).values())
+
+    def find(self, *steps: Step, within: int = 1) -> Iterator[Tuple[str, List[int]]]:
+        """Yield (script, indexes of the matched records) for every match of the steps."""
+        first = steps[0]
+        if first.opcode == ANY:
+            candidates = ((script_name, range(len(records))) for script_name, records in self.scripts.items())
+        else:
+            candidates = self.positions.get(first.opcode, {}).items()
+        for script_name, indexes in candidates:
+            records = self.scripts[script_name]
+            for index in indexes:
+                if first.matches(records[index]):
+                    match = self._extend(script_name, steps, [index], within)
+                    if match:
+                        yield script_name, match
+
+    def find_records(self, *steps: Step, within: int = 1) -> Iterator[Tuple[str, List[dict]]]:
+        for script_name, match in self.find(*steps, within=within):
+            yield script_name, [self.scripts[script_name][index] for index in match]
+
+    def reaching(
+            self,
+            cfgs: Mapping[str, cfg.ControlFlowGraph],
+            step: Step,
+            target: Step,
+            follow_far: bool = True
+    ) -> Iterator[Tuple[str, int, List[Tuple[str, int]]]]:
+        """Yield (script, index, [(script, index) of reached targets]) for commands matching step."""
+        targets = defaultdict(dict)  # script -> label -> index
+        for script_name, (index,) in self.find(target):
+            targets[script_name][self.scripts[script_name][index]['label']] = index
+        if not targets:
+            return
+        for script_name, (index,) in self.find(step):
+            reached = cfg.reachable(cfgs, script_name, self.scripts[script_name][index]['label'], follow_far)
+            hits = sorted(
+                (target_script, target_index)
+                for target_script, labels in reached.items()
+                for label, target_index in targets.get(target_script, {}).items()
+                if label in labels
+            )
+            if hits:
+                yield script_name, index, hits
+
+    def _extend(self, script_name: str, steps: Tuple[Step, ...], match: List[int], within: int) -> List[int] | None:
+        if len(match) == len(steps):
+            return match
+        step = steps[len(match)]
+        records = self.scripts[script_name]
+        start, stop = match[-1] + 1, min(match[-1] + within + 1, len(records))
+        if step.opcode == ANY:
+            candidates = range(start, stop)
+        else:
+            indexes = self.positions.get(step.opcode, {}).get(script_name, [])
+            candidates = indexes[bisect_left(indexes, start):bisect_left(indexes, stop)]
+        for index in candidates:
+            if step.matches(records[index]):
+                found = self._extend(script_name, steps, match + [index], within)
+                if found:
+                    return found
+        return None
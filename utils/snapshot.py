@@ -0,0 +1,133 @@
+"""
+Whole-project snapshot: records of all scripts and the indexes in one file.
+
+1. header:
+   - magic (4 bytes): b'LBDS'
+   - format version (1 byte), marshal version (1 byte)
+   - table offset (8 bytes)
+
+2. one section per script: record stream and blob of the compact format (see compact.py)
+
+3. one section per index (marshal): 'xref': XrefIndex.outgoing, 'lookup': LookupIndex.entries
+
+4. table (marshal): (scripts, indexes)
+   - scripts: [(name, records offset, records length, blob offset, blob length)]
+   - indexes: {index name: (offset, length)}
+
+Opening a snapshot maps the file and reads the table only, a script is decoded when its records
+are first accessed and an index when it is asked for. Strings pooled when the snapshot was written are shared inside every script
+by its record stream, there is no separate string table. Not meant for untrusted input.
+"""
+import marshal
+import mmap
+import struct
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Tuple
+
+from utils import compact
+from utils.lookup import LookupIndex
+from utils.xref import XrefIndex
+
+MAGIC = b'LBDS'
+VERSION = 3
+EXTENSION = '.snap'
+HEADER = struct.Struct('<4sBBQ')
+
+
+def dump(
+        path: str,
+        scripts: Mapping,
+        xref: XrefIndex | None = None,
+        lookup: LookupIndex | None = None
+) -> None:
+    """Write scripts (script name -> records or disassembler's Script objects) and their indexes to path."""
+    table = []
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, marshal.version, 0))
+        for script_name, records in scripts.items():
+            data, blob = compact.encode(getattr(records, 'disasm', records))
+            offset = f.tell()
+            f.write(data)
+            f.write(blob)
+            table.append((script_name, offset, len(data), offset + len(data), len(blob)))
+
+        indexes = {}
+        if xref is not None:
+            indexes['xref'] = xref.outgoing
+        if lookup is not None:
+            indexes['lookup'] = {field: dict(entries) for field, entries in lookup.entries.items()}
+        index_table = {}
+        for name, index in indexes.items():
+            data = marshal.dumps(index)
+            index_table[name] = (f.tell(), len(data))
+            f.write(data)
+        table_offset = f.tell()
+        f.write(marshal.dumps((table, index_table)))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, marshal.version, table_offset))
+
+
+class Snapshot(Mapping):
+    """
+    Read-only mapping script name -> records over a snapshot file, e.g. ScriptAssembler(disasm=Snapshot(path)).
+    Decoded records are kept.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, marshal_version, table_offset = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError('not a snapshot file')
+        if (version, marshal_version) != (VERSION, marshal.version):
+            raise ValueError(f'unsupported snapshot version {version}/{marshal_version}')
+
+        table, self.indexes = marshal.loads(self.data[table_offset:])
+        self.sections: Dict[str, Tuple[int, int, int, int]] = {entry[0]: entry[1:] for entry in table}
+        self.records: Dict[str, List[dict]] = {}
+
+    def __getitem__(self, script_name: str) -> List[dict]:
+        records = self.records.get(script_name)
+        if records is None:
+            offset, length, blob_offset, blob_length = self.sections[script_name]
+            records = compact.decode(
+                self.data[offset:offset + length],
+                self.data[blob_offset:blob_offset + blob_length]
+            )
+            self.records[script_name] = records
+        return records
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sections)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def index(self, name: str):
+        """Unmarshalled index section, None if the snapshot was written without it."""
+        if name not in self.indexes:
+            return None
+        offset, length = self.indexes[name]
+        return marshal.loads(self.data[offset:offset + length])
+
+    def xref(self) -> XrefIndex | None:
+        outgoing = self.index('xref')
+        return XrefIndex(outgoing) if outgoing is not None else None
+
+    def lookup(self) -> LookupIndex | None:
+        entries = self.index('lookup')
+        if entries is None:
+            return None
+        lookup = LookupIndex()
+        for field, values in entries.items():
+            lookup.entries[field].update(values)
+        return lookup
+
+    def close(self) -> None:
+        self.data.close()
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
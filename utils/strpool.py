@@ -0,0 +1,62 @@
+import sys
+from typing import List
+
+
+class StringPool:
+    """
+    Corpus-wide pool for the string fields whose values repeat across records (opcode names,
+    FARCALL/JUMP filenames, IFN/IFY conditions, expressions): every equal value is kept as one object.
+    Message text is left alone, it rarely repeats and a pool entry per line costs more than it saves.
+    Field names of records loaded from files go through sys.intern, they are a small fixed set.
+
+    Unlike sys.intern the pool is dropped together with its owner.
+    """
+    fields = frozenset({
+        'opcode', 'filename', 'condition', 'expr', 'expr2', 'expr3', 'varstr_str', 'rnd_from', 'rnd_to'
+    })
+
+    def __init__(self):
+        self.strings = {}
+        self.total = 0  # strings passed through the pool
+        self.total_bytes = 0
+        self.saved_bytes = 0  # size of duplicates replaced by the pooled object
+
+    def intern(self, string: str) -> str:
+        pooled = self.strings.setdefault(string, string)
+        self.total += 1
+        size = sys.getsizeof(string)
+        self.total_bytes += size
+        if pooled is not string:
+            self.saved_bytes += size
+        return pooled
+
+    def intern_values(self, record: dict) -> dict:
+        """Pool the repeating string values of a record in place; for records whose field names are constants of the code."""
+        for field in self.fields.intersection(record):
+            if type(value := record[field]) is str:
+                record[field] = self.intern(value)
+        return record
+
+    def intern_records(self, records: List[dict]) -> List[dict]:
+        """Intern field names and pool the repeating string values of records, e.g. read from JSON files."""
+        return [self.intern_values({sys.intern(field): value for field, value in record.items()}) for record in records]
+
+    def report(self) -> dict:
+        pool_bytes = sys.getsizeof(self.strings)  # the pooled strings themselves are counted in unique_bytes
+        return {
+            'unique': len(self.strings),
+            'total': self.total,
+            'unique_bytes': self.total_bytes - self.saved_bytes,
+            'total_bytes': self.total_bytes,
+            'saved_bytes': self.saved_bytes,
+            'pool_bytes': pool_bytes,
+            'net_saved_bytes': self.saved_bytes - pool_bytes
+        }
+
+    def summary(self) -> str:
+        report = self.report()
+        return (
+            f'strings: {report["unique"]} unique of {report["total"]}, '
+            f'{report["net_saved_bytes"] / 1024:.1f} KiB of {report["total_bytes"] / 1024:.1f} KiB saved '
+            f'({report["pool_bytes"] / 1024:.1f} KiB pool included)'
+        )
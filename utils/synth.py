@@ -0,0 +1,257 @@
+"""
+Synthetic scripts and PAK archives, e.g. for benchmarks and stress tests:
+
+    python -m utils.synth --platform steam --scripts 200 --commands 10000 --output SCRIPT_synth.PAK
+
+Scripts are built from scenes the way the real ones are: runs of text with voices and images,
+choices branching with IFN and joining with GOTO, battles, tasks, random branches, calls into
+other scripts and raw commands in between. Commands are encoded by the platform's assembler
+(opcode table and command layout included), labels are byte positions and every jump points at
+a command, so the scripts survive disassembling and assembling byte for byte.
+
+Only one script is kept as records at a time, a corpus of millions of commands costs its bytes.
+"""
+import argparse
+import importlib
+import random
+import sys
+from typing import Dict, Iterator, List, Mapping, Tuple
+
+from utils.pak_archive import PAKArchive
+
+# relative weights of the scenes a script is built from
+DEFAULT_MIX = {
+    'text': 50,
+    'choice': 8,
+    'battle': 5,
+    'task': 5,
+    'random': 4,
+    'call': 8,
+    'varstr': 3,
+    'raw': 17
+}
+# commands without handlers, encoded as raw arguments
+RAW_OPCODES = ('WAIT', 'MESSAGE_CLEAR', 'BGM', 'SE', 'VOICE', 'FADE', 'MOVE', 'WAIT_TIME', 'SET', 'EQU')
+LOCAL_JUMPS = {'GOTO', 'GOSUB', 'IFN', 'IFY'}  # jump_pos holds a command index until the layout
+
+
+class ScriptGenerator:
+    """
+    Deterministic generator of script binaries for one platform: the same seed, mix and sizes
+    give the same bytes.
+    """
+    def __init__(self, platform: str, seed: int = 0, mix: Mapping[str, int] | None = None):
+        self.platform = platform
+        self.rnd = random.Random(seed)
+        # steam names its files in upper case, switch in lower case
+        self.resolve = str.upper if platform == 'steam' else str.lower
+        self.assembler = importlib.import_module(f'{platform}.core.assembler').ScriptAssembler()
+        self.seen8500 = importlib.import_module(f'{platform}.core.seen8500')
+        self.seen8501 = importlib.import_module(f'{platform}.core.seen8501')
+        self.voice_opcode = 'SAYAVOICETEXT' if platform == 'steam' else 'CSAYAVOICETEXT'
+        self.task_text = ('msg_jp1', 'msg_en1') if platform == 'steam' else ('msg_jp', 'msg_en')  # first text of TASK
+        mix = mix or DEFAULT_MIX
+        self.scenes = list(mix)
+        self.weights = [mix[scene] for scene in self.scenes]
+        self.entry_points: Dict[str, List[int]] = {}  # labels of generated scripts, targets of FARCALL/JUMP
+        self.voice_id = 0
+
+    def script_names(self, count: int) -> List[str]:
+        return [self.resolve(f'seen{i:04d}') for i in range(1, count + 1)]
+
+    def script(self, script_name: str, count: int) -> Tuple[List[dict], bytes]:
+        """Records and bytes of a script of about count commands (a scene is never cut), ending with END."""
+        records = []
+        while len(records) < count - 1:
+            scene = self.rnd.choices(self.scenes, self.weights)[0]
+            getattr(self, f'{scene}_scene')(records)
+        records.append(self.command('END', flag=0, raw_args=''))
+        return records, self.layout(script_name, records)
+
+    def layout(self, script_name: str, records: List[dict]) -> bytes:
+        """Set labels and local jumps to byte positions, return the script."""
+        self.assembler.current_script = script_name
+        commands = [self.assembler.make_command(record, calc_mode=True) for record in records]
+        positions = []
+        position = 0
+        for command in commands:
+            positions.append(position)
+            position += len(command)
+
+        # jump_pos is always an uint32, so moving it from an index to a position keeps every length
+        for index, record in enumerate(records):
+            record['label'] = positions[index]
+            if record['opcode'] in LOCAL_JUMPS:
+                record['jump_pos'] = positions[record['jump_pos']]
+                commands[index] = self.assembler.make_command(record, calc_mode=True)
+
+        self.entry_points[script_name] = self.rnd.sample(positions, min(8, len(positions)))
+        return b''.join(commands)
+
+    def files(self, scripts: int, commands: int) -> Iterator[Tuple[str, bytes]]:
+        """Yield name and bytes of every script, then of SEEN8500 and SEEN8501."""
+        for script_name in self.script_names(scripts):
+            yield script_name, self.script(script_name, commands)[1]
+        yield from self.special_files().items()
+
+    def special_files(self) -> Dict[str, bytes]:
+        """SEEN8500 (accessories) and SEEN8501 (titles)."""
+        return {
+            self.resolve('SEEN8500'): self.seen8500.build(
+                [{'header': '0000'}]
+                + [{'accessory_id': i, 'jp': 'カップゼリー' if i == 0 else f'アクセサリー{i}', 'en': f'Accessory {i}',
+                    'var1': 1, 'var2': i} for i in range(200)]
+                + [{'end': '00' * 10}]  # shorter than a record
+            ),
+            self.resolve('SEEN8501'): self.seen8501.build(
+                [{'header': '0000'}]
+                + [{'title_id': i, 'jp': '困りまくりグランプリ' if i == 0 else f'称号{i}', 'en': f'Title {i}'} for i in range(200)]
+                + [{'end': '00' * 8}]  # shorter than a record
+            )
+        }
+
+    def pak(self, output_path: str, scripts: int, commands: int) -> PAKArchive:
+        return PAKArchive.create(output_path, dict(self.files(scripts, commands)))
+
+    # scenes: append records, local jump_pos are indexes into records
+
+    def command(self, opcode: str, flag: int | None = None, **fields) -> dict:
+        if flag is None:
+            flag = self.rnd.choice((0, 1, 2, 2))
+        fixed_param = [self.rnd.randrange(16), 0][:min(flag, 2)]
+        return {'label': 0, 'opcode': opcode, 'flag': flag, 'fixed_param': fixed_param, **fields}
+
+    def line(self) -> Tuple[str, str]:
+        n = self.rnd.randrange(100000)
+        return f'「台詞{n}、{"ね" * self.rnd.randrange(1, 30)}」', f'"Line {n}, {"la" * self.rnd.randrange(1, 30)}."'
+
+    def message(self, voiced: bool = True) -> dict:
+        msg_jp, msg_en = self.line()
+        if voiced:
+            self.voice_id = self.voice_id % 0xFFFF + 1  # uint16, 0 is no voice
+        return self.command('MESSAGE', voice_id=self.voice_id if voiced else 0, msg_jp=msg_jp, msg_en=msg_en, end=None)
+
+    def text_scene(self, records: List[dict]) -> None:
+        if self.rnd.random() < 0.3:
+            background = self.rnd.random() < 0.5
+            records.append(self.command(
+                'IMAGELOAD', mode=0 if background else self.rnd.randrange(1, 8), image_id=self.rnd.randrange(2000),
+                var1=None if background else self.rnd.randrange(4), pos_x=self.rnd.randrange(1280),
+                var2=0, pos_y=self.rnd.randrange(720), end=None
+            ))
+        for _ in range(self.rnd.randrange(1, 8)):
+            records.append(self.message(voiced=self.rnd.random() < 0.8))
+            if self.rnd.random() < 0.05:
+                msg_jp, msg_en = self.line()
+                records.append(self.command(self.voice_opcode, voice_id=self.rnd.randrange(500), msg_jp=msg_jp, msg_en=msg_en))
+            if self.rnd.random() < 0.4:
+                records.append(self.raw_command('WAIT'))
+
+    def choice_scene(self, records: List[dict]) -> None:
+        var_id = self.rnd.randrange(1024)
+        for choice in range(self.rnd.randrange(2, 4)):
+            record = self.command(
+                'SELECT', var_id=var_id, var0=choice, var1=0, var2=0,
+                msg_jp=f'選択肢{choice}', msg_en=f'Choice {choice}', var3=0, var4=0
+            )
+            if self.platform == 'steam':
+                record['var5'] = 0
+            records.append(record)
+        # IFN skips the first branch, its last GOTO jumps over the second one
+        first = [self.message() for _ in range(self.rnd.randrange(1, 4))]
+        second = [self.message() for _ in range(self.rnd.randrange(1, 4))]
+        start = len(records)
+        records.append(self.command('IFN', condition=f'v{var_id}==0', jump_pos=start + len(first) + 2))
+        records.extend(first)
+        records.append(self.command('GOTO', jump_pos=start + len(first) + 2 + len(second)))
+        records.extend(second)
+
+    def battle_scene(self, records: List[dict]) -> None:
+        msg_jp, msg_en = self.line()
+        expr = f'v{self.rnd.randrange(1024)}'
+        battle_type = self.rnd.choice((101, 102, 103, 420, 420))
+        match battle_type:
+            case 101:
+                fields = dict(var1=self.rnd.randrange(64), var2=0, var3=self.rnd.randrange(64), expr=expr)
+            case 102:
+                fields = dict(var1=0, var2=self.rnd.randrange(64), expr=expr, expr2=None)
+                if self.rnd.random() < 0.5:
+                    msg_jp2, msg_en2 = self.line()
+                    fields.update(expr2=f'{expr}+1', msg_jp2=msg_jp2, msg_en2=msg_en2, expr3=None)
+            case 103:
+                msg_jp2, msg_en2 = self.line()
+                fields = dict(expr=expr, msg_jp2=msg_jp2, msg_en2=msg_en2)
+            case _:
+                fields = dict(expr=expr, expr2=str(self.rnd.randrange(8)))
+        if battle_type != 420:
+            fields.update(msg_jp=msg_jp, msg_en=msg_en)
+        records.append(self.command('BATTLE', battle_type=battle_type, **fields))
+        records.append(self.message())
+
+    def task_scene(self, records: List[dict]) -> None:
+        text = dict(zip(self.task_text, self.line()))
+        msg_jp2, msg_en2 = self.line()
+        match self.rnd.choice((4, 4, 54, 69)):
+            case 4:
+                var1 = self.rnd.choice((0, 1, 4, 5, 6))
+                fields = dict(var1=var1, var2=self.rnd.randrange(64), **text)
+                if var1 == 1:
+                    fields.update(var3=self.rnd.randrange(64), var4=self.rnd.randrange(64), msg_jp2=msg_jp2, msg_en2=msg_en2)
+                elif var1 == 6:
+                    fields['var3'] = self.rnd.randrange(64)
+                records.append(self.command('TASK', task_type=4, **fields))
+            case 54:
+                records.append(self.command('TASK', task_type=54, **{self.task_text[1]: text[self.task_text[1]]}))
+            case _:
+                records.append(self.command(
+                    'TASK', task_type=69, var1=self.rnd.randrange(64), **text, msg_jp2=msg_jp2, msg_en2=msg_en2
+                ))
+
+    def random_scene(self, records: List[dict]) -> None:
+        var1 = self.rnd.randrange(1024)
+        records.append(self.command('RANDOM', var1=var1, rnd_from='0', rnd_to=str(self.rnd.randrange(1, 10))))
+        lines = self.rnd.randrange(1, 4)
+        records.append(self.command('IFY', condition=f'v{var1}<5', jump_pos=len(records) + 1 + lines))
+        records.extend(self.message() for _ in range(lines))
+
+    def call_scene(self, records: List[dict]) -> None:
+        targets = list(self.entry_points)
+        kind = self.rnd.random()
+        if not targets or kind < 0.3:
+            records.append(self.command('GOSUB', arg1=0, jump_pos=self.rnd.randrange(len(records) + 1), end=None))
+            return
+        filename = self.rnd.choice(targets)
+        jump_pos = self.rnd.choice(self.entry_points[filename])
+        if kind < 0.9:
+            records.append(self.command('FARCALL', index=0, filename=filename, jump_pos=jump_pos, end=None))
+        else:
+            records.append(self.command('JUMP', filename=filename, jump_pos=jump_pos if kind < 0.95 else None))
+
+    def varstr_scene(self, records: List[dict]) -> None:
+        records.append(self.command('VARSTR_SET', varstr_id=self.rnd.randrange(64), varstr_str=f'名前{self.rnd.randrange(100)}'))
+
+    def raw_scene(self, records: List[dict]) -> None:
+        for _ in range(self.rnd.randrange(1, 5)):
+            records.append(self.raw_command(self.rnd.choice(RAW_OPCODES)))
+
+    def raw_command(self, opcode: str) -> dict:
+        return self.command(opcode, raw_args=self.rnd.randbytes(2 * self.rnd.randrange(0, 5)).hex())
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Generate a PAK of synthetic scripts')
+    parser.add_argument('--platform', choices=('steam', 'switch'), default='steam')
+    parser.add_argument('--scripts', type=int, default=20, help='number of scripts')
+    parser.add_argument('--commands', type=int, default=2000, help='commands per script')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='SCRIPT_synth.PAK')
+    args = parser.parse_args(argv)
+
+    generator = ScriptGenerator(args.platform, args.seed)
+    pak = generator.pak(args.output, args.scripts, args.commands)
+    print(f'{len(pak.file_list)} files saved in {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Mapping, Tuple
+
+# errors of decoding a malformed command
+DECODE_ERRORS = (struct.error, IndexError, KeyError, ValueError)
+
+
+class Mismatch:
+    """First difference between the original and the rebuilt script."""
+    def __init__(
+            self,
+            script: str,
+            index: int,
+            label: int,
+            opcode: str,
+            field: str,
+            original: Any,
+            rebuilt: Any,
+            reason: str = ''
+    ):
+        self.script = script
+        self.index = index  # command index
+        self.label = label  # position of the command in the original script
+        self.opcode = opcode
+        self.field = field
+        self.original = original
+        self.rebuilt = rebuilt
+        self.reason = reason  # why a command cannot be compared field by field, e.g. it is malformed
+
+    def __str__(self) -> str:
+        location = f'{self.script}: command #{self.index} (label {self.label}) {self.opcode}, {self.field}: '
+        if self.reason:
+            return location + self.reason
+        return location + f'{self.original!r} != {self.rebuilt!r}'
+
+
+def split_commands(disassembler_cls, asm: bytes) -> Tuple[list, str | None]:
+    """Commands of the stream up to the first malformed one, and what is wrong with that one."""
+    commands = []
+    pos = 0
+    try:
+        for command in disassembler_cls.iter_commands(asm):
+            pos, length = command[:2]
+            if length < 4:
+                return commands, f'command length {length} at {pos}'
+            if pos + length > len(asm):
+                return commands, f'command of {length} bytes at {pos} is cut off at {len(asm)}'
+            commands.append(command)
+            pos += (length + 1) & ~1
+    except struct.error:
+        return commands, f'truncated command header at {pos}'
+    return commands, None
+
+
+def compare_script(disassembler_cls, script_name: str, original: bytes, rebuilt: bytes) -> Mismatch | None:
+    """
+    Walk both command streams together and return the first differing command with its first
+    differing field, None if the scripts are identical.
+    """
+    if original == rebuilt:
+        return None
+    commands, error = split_commands(disassembler_cls, original)
+    rebuilt_commands, rebuilt_error = split_commands(disassembler_cls, rebuilt)
+    decoder = None
+    for index, ((pos, length, _, _), (rebuilt_pos, rebuilt_length, _, _)) in enumerate(zip(commands, rebuilt_commands)):
+        command = original[pos:pos + length + length % 2]
+        rebuilt_command = rebuilt[rebuilt_pos:rebuilt_pos + rebuilt_length + rebuilt_length % 2]
+        if command == rebuilt_command:
+            continue
+        decoder = decoder or disassembler_cls()
+        which = 'original'
+        try:
+            record = decoder.decode_command(script_name, command)
+            which = 'rebuilt'
+            rebuilt_record = decoder.decode_command(script_name, rebuilt_command)
+        except DECODE_ERRORS as e:
+            return Mismatch(
+                script_name, index, pos, opcode_name(disassembler_cls, command[2]), 'bytes', command, rebuilt_command,
+                f'cannot decode the {which} command: {e!r}'
+            )
+        record['length'], rebuilt_record['length'] = length, rebuilt_length
+        for field in ('opcode', 'flag', 'fixed_param', *record, *rebuilt_record):
+            if record.get(field) != rebuilt_record.get(field):
+                return Mismatch(script_name, index, pos, record['opcode'], field, record.get(field), rebuilt_record.get(field))
+        return Mismatch(script_name, index, pos, record['opcode'], 'align', command[length:], rebuilt_command[rebuilt_length:])
+
+    # a malformed stream, the commands before the broken one are the same
+    if error or rebuilt_error:
+        if rebuilt_error:
+            which, index, reason = 'rebuilt', len(rebuilt_commands), rebuilt_error
+        else:
+            which, index, reason = 'original', len(commands), error
+        pos, opcode = len(original), ''
+        if index < len(commands):
+            pos, opcode = commands[index][0], opcode_name(disassembler_cls, commands[index][2])
+        return Mismatch(script_name, index, pos, opcode, 'command stream', None, None, f'{which} script is malformed: {reason}')
+
+    # one stream is longer: report its first extra command
+    index = min(len(commands), len(rebuilt_commands))
+    if len(commands) == len(rebuilt_commands):  # same commands, bytes after the last one differ
+        return Mismatch(script_name, index, len(original), '', 'trailing bytes', len(original), len(rebuilt))
+    pos, _, opcode, _ = (commands if len(commands) > index else rebuilt_commands)[index]
+    return Mismatch(
+        script_name, index, pos, opcode_name(disassembler_cls, opcode), 'command count', len(commands), len(rebuilt_commands)
+    )
+
+
+def opcode_name(disassembler_cls, opcode: int) -> str:
+    disassembler_cls.load_opcodes()
+    return disassembler_cls.opcodes.get(opcode, f'0x{opcode:02x}')
+
+
+def verify_scripts(
+        disassembler_cls,
+        scripts: Mapping[str, Tuple[bytes, bytes]],
+        workers: int | None = None
+) -> List[Mismatch]:
+    """
+    Compare every script (name -> (original, rebuilt)) in parallel across processes; identical
+    scripts are filtered out here, only differing ones are walked command by command.
+    """
+    different = [(script_name, pair) for script_name, pair in scripts.items() if pair[0] != pair[1]]
+    if not different:
+        return []
+    if workers == 1 or len(different) == 1:
+        results = [compare_script(disassembler_cls, script_name, *pair) for script_name, pair in different]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                compare_script,
+                [disassembler_cls] * len(different),
+                [script_name for script_name, _ in different],
+                [pair[0] for _, pair in different],
+                [pair[1] for _, pair in different]
+            ))
+    return [mismatch for mismatch in results if mismatch is not None]
@@ -0,0 +1,86 @@
+import ctypes
+import os
+import select
+import struct
+import time
+from typing import Dict, Iterator, Set, Tuple
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080  # editors often save by renaming a temporary file
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class FolderWatcher:
+    """
+    Names of changed files in a folder. Uses inotify on Linux (through libc, no extra packages),
+    elsewhere or if inotify is not available it polls modification times every interval seconds.
+
+    Changes are reported in batches: after the first event the watcher waits for settle seconds
+    so that a save touching several files, or one file several times, is one batch.
+    """
+    def __init__(self, folder: str, suffix: str = '.json', interval: float = 0.5, settle: float = 0.05):
+        self.folder = folder
+        self.suffix = suffix
+        self.interval = interval
+        self.settle = settle
+        self.fd: int | None = None
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd >= 0 and libc.inotify_add_watch(fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO) >= 0:
+                self.fd = fd
+            elif fd >= 0:
+                os.close(fd)
+        except (AttributeError, OSError):  # not Linux
+            pass
+        self.mtimes = self.scan() if self.fd is None else {}
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self.fd is not None else 'polling'
+
+    def changes(self) -> Iterator[Set[str]]:
+        """Block until files change and yield their names, endlessly."""
+        while True:
+            changed = self.wait_inotify() if self.fd is not None else self.wait_polling()
+            if changed:
+                yield changed
+
+    def wait_inotify(self) -> Set[str]:
+        changed = set()
+        timeout = None
+        while select.select([self.fd], [], [], timeout)[0]:
+            data = os.read(self.fd, 65536)
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+                offset += length
+                if name.endswith(self.suffix):
+                    changed.add(name)
+            timeout = self.settle
+        return changed
+
+    def wait_polling(self) -> Set[str]:
+        time.sleep(self.interval)
+        mtimes = self.scan()
+        changed = {name for name, stat in mtimes.items() if self.mtimes.get(name) != stat}
+        self.mtimes = mtimes
+        if changed:
+            time.sleep(self.settle)
+            mtimes = self.scan()
+            changed |= {name for name, stat in mtimes.items() if self.mtimes.get(name) != stat}
+            self.mtimes = mtimes
+        return changed
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        return {
+            entry.name: (entry.stat().st_mtime_ns, entry.stat().st_size)
+            for entry in os.scandir(self.folder) if entry.name.endswith(self.suffix)
+        }
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
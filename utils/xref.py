@@ -0,0 +1,84 @@
+import json
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Mapping, Set, Tuple
+
+
+class XrefIndex:
+    """
+    Cross-reference index of jumps between labels of disassembled scripts.
+
+    Every command with jump_pos (GOTO, GOSUB, IFN, IFY, JUMP, FARCALL) is an outgoing jump
+    of its script: (label, opcode, target script, target label). GOTO/GOSUB/IFN/IFY jump inside
+    their own script, JUMP/FARCALL into the script named by their filename (JUMP without jump_pos
+    targets the start of the script, its target label is None).
+
+    Incoming jumps and the FARCALL/JUMP graph between scripts are derived from the outgoing ones,
+    so only those are saved.
+    """
+    def __init__(self, outgoing: Dict[str, List[Tuple[int, str, str, int | None]]] | None = None):
+        self.outgoing: Dict[str, List[Tuple[int, str, str, int | None]]] = outgoing or {}
+        self.incoming: Dict[str, Dict[int | None, List[Tuple[str, int, str]]]] = defaultdict(lambda: defaultdict(list))
+        for script_name, jumps in self.outgoing.items():
+            for label, opcode, target_script, target_label in jumps:
+                self.incoming[target_script][target_label].append((script_name, label, opcode))
+
+    @classmethod
+    def build(cls, scripts: Mapping[str, Iterable[dict]], resolve: Callable[[str], str]) -> 'XrefIndex':
+        """
+        Index records of all scripts (script name -> records or disassembler's Script objects);
+        resolve turns a JUMP/FARCALL filename into a script name.
+        """
+        outgoing = {}
+        for script_name, records in scripts.items():
+            jumps = []
+            for cmd in getattr(records, 'disasm', records):
+                if 'jump_pos' not in cmd:
+                    continue
+                target_script = resolve(cmd['filename']) if 'filename' in cmd else script_name
+                jumps.append((cmd['label'], cmd['opcode'], target_script, cmd['jump_pos']))
+            outgoing[script_name] = jumps
+        return cls(outgoing)
+
+    def jumps_to(self, script_name: str, label: int | None = None) -> List[Tuple[str, int, str]]:
+        """(source script, source label, opcode) of jumps to the label, or to any label of the script."""
+        incoming = self.incoming.get(script_name, {})
+        if label is not None:
+            return list(incoming.get(label, ()))
+        return [jump for jumps in incoming.values() for jump in jumps]
+
+    def jumps_from(self, script_name: str) -> List[Tuple[int, str, str, int | None]]:
+        return list(self.outgoing.get(script_name, []))
+
+    def labels(self, script_name: str) -> List[int]:
+        """Labels of the script that are jump targets."""
+        return sorted(label for label in self.incoming.get(script_name, ()) if label is not None)
+
+    def script_graph(self) -> Dict[str, Set[str]]:
+        """FARCALL/JUMP graph: script -> scripts it calls or jumps to."""
+        graph = {script_name: set() for script_name in self.outgoing}
+        for script_name, jumps in self.outgoing.items():
+            for _, _, target_script, _ in jumps:
+                if target_script != script_name:
+                    graph[script_name].add(target_script)
+        return graph
+
+    def dependents(self, script_name: str, from_label: int = 0) -> Set[str]:
+        """
+        Scripts with jumps to labels of the script at or after from_label: their bytes have to be
+        patched when the script is laid out again from that point.
+        """
+        return {
+            source for label, jumps in self.incoming.get(script_name, {}).items()
+            if label is not None and label >= from_label
+            for source, _, _ in jumps
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump(self.outgoing, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'XrefIndex':
+        with open(path, 'r', encoding='UTF-8') as f:
+            outgoing = json.load(f)
+        return cls({script_name: [tuple(jump) for jump in jumps] for script_name, jumps in outgoing.items()})